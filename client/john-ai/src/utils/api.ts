@@ -10,6 +10,8 @@ export interface CallBusinessRequest {
   service_description: string;
   user_location: string;
   detail: string;
+  // Call even if the business has already been reached (the server answers 409 otherwise)
+  force?: boolean;
 }
 
 export const callBusiness = async (request: CallBusinessRequest) => {
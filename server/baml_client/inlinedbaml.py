@@ -16,9 +16,10 @@
 
 file_map = {
     
-    "clients.baml": "// Learn more about clients at https://docs.boundaryml.com/docs/snippets/clients/overview\n\nclient<llm> CustomGPT4o {\n  provider openai\n  options {\n    model \"gpt-4o\"\n    api_key env.OPENAI_API_KEY\n  }\n}\n\nclient<llm> CustomSonnet {\n  provider anthropic\n  options {\n    model \"claude-3-5-sonnet-20241022\"\n    api_key env.ANTHROPIC_API_KEY\n  }\n}",
+    "business.baml": "class BusinessListing {\n  name string @description(\"The name of the business.\")\n  url string @description(\"The business's own website URL.\")\n  phone_number string? @description(\"The business's phone number, or null if the listing doesn't show one.\")\n}\n\n// Resolve search result snippets the HTML parser couldn't read unambiguously.\nfunction ExtractBusinessListings(snippets: string) -> BusinessListing[] {\n  client CustomGPT4oMini\n  prompt #\"\n    Each numbered entry below is a search result for a local business. For each\n    entry that is a single small business (not a directory, aggregator or\n    review site), give its name, website URL and main phone number.\n\n    {{ snippets }}\n\n    {{ ctx.output_format }}\n  \"#\n}\n",
+    "clients.baml": "// Learn more about clients at https://docs.boundaryml.com/docs/snippets/clients/overview\n\nclient<llm> CustomGPT4o {\n  provider openai\n  options {\n    model \"gpt-4o\"\n    api_key env.OPENAI_API_KEY\n  }\n}\n\nclient<llm> CustomGPT4oMini {\n  provider openai\n  options {\n    model \"gpt-4o-mini\"\n    api_key env.OPENAI_API_KEY\n  }\n}\n\nclient<llm> CustomSonnet {\n  provider anthropic\n  options {\n    model \"claude-3-5-sonnet-20241022\"\n    api_key env.ANTHROPIC_API_KEY\n  }\n}",
     "generators.baml": "// This helps use auto generate libraries you can use in the language of\n// your choice. You can have multiple generators if you use multiple languages.\n// Just ensure that the output_dir is different for each generator.\ngenerator target {\n    // Valid values: \"python/pydantic\", \"typescript\", \"ruby/sorbet\", \"rest/openapi\"\n    output_type \"python/pydantic\"\n\n    // Where the generated code will be saved (relative to baml_src/)\n    output_dir \"../\"\n\n    // The version of the BAML package you have installed (e.g. same version as your baml-py or @boundaryml/baml).\n    // The BAML VSCode extension version should also match this version.\n    version \"0.76.2\"\n\n    // Valid values: \"sync\", \"async\"\n    // This controls what `b.FunctionName()` will be (sync or async).\n    default_client_mode sync\n}\n",
-    "quote.baml": "// Defining a data model.\nclass Quote {\n  quote_amount float? @description(\"The amount that was quoted.\")\n  notes string @description(\"Any additional notes or caveats about the product or service or quote.\")\n}\n\n// Create a function to extract the resume from a string.\nfunction ExtractQuote(transcript: string) -> Quote {\n  // Specify a client as provider/model-name\n  // you can use custom LLM params with a custom client name from clients.baml like \"client CustomHaiku\"\n  client CustomSonnet\n  prompt #\"\n    Extract information from this call transcript:\n    {{ transcript }}\n\n    {{ ctx.output_format }}\n  \"#\n}",
+    "quote.baml": "// Defining a data model.\nclass Quote {\n  quote_amount float? @description(\"The amount that was quoted.\")\n  notes string @description(\"Any additional notes or caveats about the product or service or quote.\")\n  discount_accepted bool? @description(\"Whether the business agreed to the requested discount, or null if it never came up.\")\n}\n\n// Create a function to extract the resume from a string.\nfunction ExtractQuote(transcript: string) -> Quote {\n  // Specify a client as provider/model-name\n  // you can use custom LLM params with a custom client name from clients.baml like \"client CustomHaiku\"\n  client CustomSonnet\n  prompt #\"\n    Extract information from this call transcript:\n    {{ transcript }}\n\n    {{ ctx.output_format }}\n  \"#\n}",
 }
 
 def get_baml_files():
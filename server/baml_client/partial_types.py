@@ -34,6 +34,12 @@ class StreamState(BaseModel, Generic[T]):
     state: Literal["Pending", "Incomplete", "Complete"]
 
 
+class BusinessListing(BaseModel):
+    name: Optional[str] = None
+    url: Optional[str] = None
+    phone_number: Optional[str] = None
+
 class Quote(BaseModel):
     quote_amount: Optional[float] = None
     notes: Optional[str] = None
+    discount_accepted: Optional[bool] = None
@@ -47,6 +47,29 @@ class BamlSyncClient:
       return self.__stream_client
 
     
+    def ExtractBusinessListings(
+        self,
+        snippets: str,
+        baml_options: BamlCallOptions = {},
+    ) -> List[types.BusinessListing]:
+      __tb__ = baml_options.get("tb", None)
+      if __tb__ is not None:
+        tb = __tb__._tb # type: ignore (we know how to use this private attribute)
+      else:
+        tb = None
+      __cr__ = baml_options.get("client_registry", None)
+
+      raw = self.__runtime.call_function_sync(
+        "ExtractBusinessListings",
+        {
+          "snippets": snippets,
+        },
+        self.__ctx_manager.get(),
+        tb,
+        __cr__,
+      )
+      return cast(List[types.BusinessListing], raw.cast_to(types, types, partial_types, False))
+    
     def ExtractQuote(
         self,
         transcript: str,
@@ -82,6 +105,36 @@ class BamlStreamClient:
       self.__ctx_manager = ctx_manager
 
     
+    def ExtractBusinessListings(
+        self,
+        snippets: str,
+        baml_options: BamlCallOptions = {},
+    ) -> baml_py.BamlSyncStream[List[partial_types.BusinessListing], List[types.BusinessListing]]:
+      __tb__ = baml_options.get("tb", None)
+      if __tb__ is not None:
+        tb = __tb__._tb # type: ignore (we know how to use this private attribute)
+      else:
+        tb = None
+      __cr__ = baml_options.get("client_registry", None)
+
+      raw = self.__runtime.stream_function_sync(
+        "ExtractBusinessListings",
+        {
+          "snippets": snippets,
+        },
+        None,
+        self.__ctx_manager.get(),
+        tb,
+        __cr__,
+      )
+
+      return baml_py.BamlSyncStream[List[partial_types.BusinessListing], List[types.BusinessListing]](
+        raw,
+        lambda x: cast(List[partial_types.BusinessListing], x.cast_to(types, types, partial_types, True)),
+        lambda x: cast(List[types.BusinessListing], x.cast_to(types, types, partial_types, False)),
+        self.__ctx_manager.get(),
+      )
+    
     def ExtractQuote(
         self,
         transcript: str,
@@ -40,6 +40,12 @@ def all_succeeded(checks: Dict[CheckName, Check]) -> bool:
 
 
 
+class BusinessListing(BaseModel):
+    name: str
+    url: str
+    phone_number: Optional[str] = None
+
 class Quote(BaseModel):
     quote_amount: Optional[float] = None
     notes: str
+    discount_accepted: Optional[bool] = None
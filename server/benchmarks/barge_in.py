@@ -0,0 +1,148 @@
+"""
+Measure barge-in-to-silence latency on the Twilio downlink with fake sockets.
+
+  python -m benchmarks.barge_in [--trials 8] [--write-delay 0.005] [--bandwidth 24000]
+
+A fake ElevenLabs agent produces several seconds of speech faster than real
+time, in chunks of varying size, and a fake Twilio socket plays whatever it
+receives at 8 kHz. Each message takes --write-delay plus its size over
+--bandwidth (bytes/s) to write, so a backlog builds up when the agent speaks
+faster than the socket drains, as it does under backpressure. Partway
+through, the business interrupts. For the old FIFO writer (clear queued
+behind the audio) and for the paced downlink queue this reports the time from
+interruption to clear reaching Twilio, the stale speech the business hears in
+between, playback gaps before the interruption and the media messages sent.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import os
+import random
+import statistics
+import time
+
+from server.downlink import MULAW_BYTES_PER_SECOND, DownlinkQueue
+
+SPEECH_SECONDS = 6.0
+# ElevenLabs streams speech several times faster than it plays
+GENERATION_SPEEDUP = 8.0
+
+
+class FakeTwilio:
+  """Plays received audio in real time; clear empties the playback buffer."""
+  def __init__(self, write_delay: float, bandwidth: float):
+    self.write_delay = write_delay
+    self.bandwidth = bandwidth
+    self.buffered = 0.0
+    self.last = None
+    self.interrupted_at = None
+    self.cleared_at = None
+    self.stale = 0.0
+    self.gaps = 0.0
+    self.messages = 0
+
+  def advance(self, now: float):
+    if self.last is not None and self.cleared_at is None:
+      elapsed = now - self.last
+      played = min(self.buffered, elapsed)
+      if self.interrupted_at is not None:
+        self.stale += played
+      else:
+        self.gaps += elapsed - played
+      self.buffered -= played
+    self.last = now
+
+  async def send_json(self, message: dict):
+    await asyncio.sleep(self.write_delay + len(json.dumps(message)) / self.bandwidth)
+    now = time.monotonic()
+    if message["event"] == "media":
+      self.messages += 1
+      if self.cleared_at is None:
+        self.advance(now)
+        self.buffered += len(base64.b64decode(message["media"]["payload"])) / MULAW_BYTES_PER_SECOND
+    elif message["event"] == "clear" and self.cleared_at is None:
+      self.advance(now)
+      self.buffered = 0.0
+      self.cleared_at = now
+
+
+class FifoDownlink:
+  """The previous writer: one queue, each message sent in arrival order."""
+  def __init__(self, send):
+    self.send = send
+    self.queue = asyncio.Queue()
+
+  async def push_audio(self, payload: str):
+    await self.queue.put({"event": "media", "streamSid": "MZbench", "media": {"payload": payload}})
+
+  def flush(self):
+    self.queue.put_nowait({"event": "clear", "streamSid": "MZbench"})
+
+  async def run(self):
+    while True:
+      await self.send(await self.queue.get())
+
+
+async def trial(make_downlink, write_delay: float, bandwidth: float, interrupt_after: float, seed: int) -> dict:
+  rng = random.Random(seed)
+  twilio = FakeTwilio(write_delay, bandwidth)
+  downlink = make_downlink(twilio.send_json)
+  writer = asyncio.create_task(downlink.run())
+
+  async def agent():
+    remaining = int(SPEECH_SECONDS * MULAW_BYTES_PER_SECOND)
+    while remaining > 0:
+      size = min(remaining, rng.choice((160, 320, 640, 1600, 4000)))
+      remaining -= size
+      await downlink.push_audio(base64.b64encode(os.urandom(size)).decode())
+      await asyncio.sleep(size / MULAW_BYTES_PER_SECOND / GENERATION_SPEEDUP)
+
+  speaking = asyncio.create_task(agent())
+  await asyncio.sleep(interrupt_after)
+  # ElevenLabs stops generating and tells us the business interrupted
+  speaking.cancel()
+  twilio.advance(time.monotonic())
+  twilio.interrupted_at = time.monotonic()
+  downlink.flush()
+  while twilio.cleared_at is None:
+    await asyncio.sleep(0.001)
+  writer.cancel()
+  return {
+    "latency": twilio.cleared_at - twilio.interrupted_at,
+    "stale": twilio.stale,
+    "gaps": twilio.gaps,
+    "messages": twilio.messages,
+  }
+
+
+def report(label: str, results: list):
+  latencies = sorted(result["latency"] * 1000 for result in results)
+  p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+  print(
+    f"{label:<8} barge-in to silence mean {statistics.mean(latencies):8.1f} ms  p95 {p95:8.1f} ms"
+    f"  stale speech {statistics.mean(result['stale'] for result in results) * 1000:7.1f} ms"
+    f"  gaps {statistics.mean(result['gaps'] for result in results) * 1000:6.1f} ms"
+    f"  messages {statistics.mean(result['messages'] for result in results):6.1f}"
+  )
+
+
+async def main(trials: int, write_delay: float, bandwidth: float):
+  rng = random.Random(0)
+  interrupts = [rng.uniform(1.0, 4.0) for _ in range(trials)]
+  for label, make_downlink in (("fifo", FifoDownlink), ("paced", DownlinkQueue)):
+    # Trials are independent calls, so run them side by side like concurrent sessions
+    results = await asyncio.gather(*(
+      trial(make_downlink, write_delay, bandwidth, interrupt_after, seed)
+      for seed, interrupt_after in enumerate(interrupts)
+    ))
+    report(label, results)
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--trials", type=int, default=8)
+  parser.add_argument("--write-delay", type=float, default=0.005, help="seconds Twilio takes to accept each message")
+  parser.add_argument("--bandwidth", type=float, default=24000, help="bytes per second the Twilio socket drains")
+  args = parser.parse_args()
+  asyncio.run(main(args.trials, args.write_delay, args.bandwidth))
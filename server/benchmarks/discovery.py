@@ -0,0 +1,48 @@
+"""
+Compare browserless discovery with the browser agent.
+
+  python -m benchmarks.discovery [--llm] [--agent] [--item-type plumbing] [--county "San Mateo County"]
+
+The fast path always runs against the local fixture server. --llm lets it send
+ambiguous results to the LLM, and --agent also runs the browser agent against
+Google for comparison. Both need OPENAI_API_KEY.
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.fixture_server import fixture_url_template, start_fixture_server
+from server.discovery import HttpSearchBackend, discover_businesses, find_businesses_with_agent
+from server.serialization import parse_find_businesses_result
+
+
+async def main(item_type: str, county: str, llm: bool, agent: bool):
+  server = start_fixture_server()
+  try:
+    backend = HttpSearchBackend(fixture_url_template(server))
+    started = time.perf_counter()
+    result, tokens = await discover_businesses(item_type, county, backend=backend, use_llm=llm)
+    elapsed = time.perf_counter() - started
+  finally:
+    server.shutdown()
+
+  for business in result.businesses:
+    print(f"  {business.name:<45} {business.url:<40} {business.phone_number}")
+  print(f"fast path:  {len(result.businesses):>2} businesses in {elapsed:8.3f} s, ~{tokens} tokens")
+
+  if agent:
+    started = time.perf_counter()
+    raw, tokens = await find_businesses_with_agent(item_type, county)
+    elapsed = time.perf_counter() - started
+    count = len(parse_find_businesses_result(raw).businesses) if raw else 0
+    print(f"agent path: {count:>2} businesses in {elapsed:8.3f} s, {tokens} input tokens")
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--item-type", default="plumbing")
+  parser.add_argument("--county", default="San Mateo County")
+  parser.add_argument("--llm", action="store_true", help="resolve ambiguous results with the LLM")
+  parser.add_argument("--agent", action="store_true", help="also run the browser agent")
+  args = parser.parse_args()
+  asyncio.run(main(args.item_type, args.county, args.llm, args.agent))
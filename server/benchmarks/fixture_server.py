@@ -0,0 +1,42 @@
+"""
+Serves the saved search result pages in benchmarks/fixtures over HTTP, standing
+in for a real search engine. /search?page=N returns search_page_N.html, or an
+empty results page once the fixtures run out.
+"""
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+EMPTY_PAGE = b"<html><body><div class='results'></div></body></html>"
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+  def do_GET(self):
+    page = parse_qs(urlsplit(self.path).query).get("page", ["0"])[0]
+    path = os.path.join(FIXTURES_DIR, f"search_page_{int(page)}.html")
+    body = EMPTY_PAGE
+    if os.path.exists(path):
+      with open(path, "rb") as f:
+        body = f.read()
+    self.send_response(200)
+    self.send_header("Content-Type", "text/html; charset=utf-8")
+    self.send_header("Content-Length", str(len(body)))
+    self.end_headers()
+    self.wfile.write(body)
+
+  def log_message(self, format, *args):
+    pass
+
+
+def start_fixture_server() -> ThreadingHTTPServer:
+  """Start the server on a free port in a background thread. Stop it with shutdown()."""
+  server = ThreadingHTTPServer(("127.0.0.1", 0), FixtureHandler)
+  threading.Thread(target=server.serve_forever, daemon=True).start()
+  return server
+
+
+def fixture_url_template(server: ThreadingHTTPServer) -> str:
+  host, port = server.server_address
+  return f"http://{host}:{port}/search?q={{query}}&page={{page}}"
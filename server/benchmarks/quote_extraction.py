@@ -0,0 +1,67 @@
+"""
+Evaluate tiered quote extraction over the local transcript store.
+
+  python -m benchmarks.quote_extraction [--store PATH] [--models] [--limit N]
+
+Without --models only the deterministic tier runs, which needs no API keys and
+shows how many transcripts it settles. With --models every transcript is also
+run through the full tiered extractor and through the strong model alone, and
+the tiered result is scored against the strong one.
+"""
+import argparse
+import asyncio
+import time
+
+from baml_client import b as baml
+from server.quotes import extract_quote_deterministic, extract_quote_tiered, quote_extraction_stats, same_amount
+from server.resilience import anthropic_provider
+from server.transcripts import TRANSCRIPT_STORE_PATH, TranscriptStore, format_transcript
+
+
+async def main(store_path: str, models: bool, limit: int):
+  store = TranscriptStore(store_path)
+  evaluated = settled = agreed = 0
+  deterministic_time = strong_time = 0.0
+
+  for conversation_id, transcript in store.iter_transcripts():
+    if limit and evaluated >= limit:
+      break
+    evaluated += 1
+
+    started = time.perf_counter()
+    quote, _ = extract_quote_deterministic(transcript)
+    deterministic_time += time.perf_counter() - started
+    settled += quote is not None
+
+    if models:
+      tiered, tier = await extract_quote_tiered(transcript)
+      started = time.perf_counter()
+      reference = await anthropic_provider.run_sync(baml.ExtractQuote, format_transcript(transcript))
+      strong_time += time.perf_counter() - started
+      match = same_amount(tiered.quote_amount, reference.quote_amount)
+      agreed += match
+      if not match:
+        print(f"{conversation_id}: {tier} tier said {tiered.quote_amount}, strong model said {reference.quote_amount}")
+
+  if not evaluated:
+    print(f"No transcripts in {store_path}")
+    return
+
+  print(f"Transcripts evaluated:           {evaluated}")
+  print(f"Settled by deterministic parser: {settled} ({settled / evaluated:.1%})")
+  print(f"Deterministic mean latency:      {deterministic_time / evaluated * 1000:.3f} ms")
+  if models:
+    print(f"Tiered agrees with strong model: {agreed} ({agreed / evaluated:.1%})")
+    print(f"Strong-only mean latency:        {strong_time / evaluated:.2f} s")
+    for tier, stats in quote_extraction_stats.snapshot()["tiers"].items():
+      mean_latency = f"{stats['mean_latency']:.3f} s" if stats["mean_latency"] is not None else "-"
+      print(f"  {tier:<14} hit rate {stats['hit_rate']:.1%}  mean latency {mean_latency}")
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--store", default=TRANSCRIPT_STORE_PATH)
+  parser.add_argument("--models", action="store_true", help="also run the fast and strong models")
+  parser.add_argument("--limit", type=int, default=0)
+  args = parser.parse_args()
+  asyncio.run(main(args.store, args.models, args.limit))
@@ -0,0 +1,50 @@
+"""
+Measure what the call recorder adds to each relayed frame.
+
+  python -m benchmarks.recorder [frames]
+
+Records 20 ms mu-law frames (160 bytes, base64 encoded as on the wire) and
+reports the cost of each record call on the relay path, next to the 20 ms
+budget a frame has, plus the time the background flushes took overall.
+"""
+import asyncio
+import base64
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from server.recording import MEDIA_INBOUND, MEDIA_OUTBOUND, CallRecorder, read_recording
+
+FRAME = base64.b64encode(os.urandom(160)).decode()
+
+
+async def main(frames: int):
+  with tempfile.TemporaryDirectory() as directory:
+    recorder = CallRecorder(os.path.join(directory, "bench.rec"))
+    recorder.start()
+    timings = []
+    for i in range(frames):
+      started = time.perf_counter_ns()
+      recorder.media(MEDIA_INBOUND if i % 2 else MEDIA_OUTBOUND, FRAME)
+      timings.append(time.perf_counter_ns() - started)
+      if i % 500 == 0:
+        # Yield like the relay does between frames so flushes can run
+        await asyncio.sleep(0)
+    started = time.perf_counter()
+    await recorder.close()
+    closing = time.perf_counter() - started
+    recorded = sum(1 for _ in read_recording(recorder.path))
+
+  timings.sort()
+  print(f"frames recorded       {recorded}")
+  print(f"mean per frame        {statistics.mean(timings) / 1000:.2f} us")
+  print(f"p99 per frame         {timings[int(len(timings) * 0.99)] / 1000:.2f} us")
+  print(f"share of 20 ms frame  {statistics.mean(timings) / 20_000_000:.4%}")
+  print(f"bytes per frame       {recorder.bytes_written / frames:.1f}")
+  print(f"final flush           {closing * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+  asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000))
@@ -0,0 +1,124 @@
+"""
+Replay a recorded call into the media stream relay, acting as Twilio.
+
+  python -m benchmarks.replay RECORDING [--url ws://localhost:8080/outbound-media-stream] [--speed 1.0]
+  python -m benchmarks.replay RECORDING --summary
+
+The recorded start event (with its prompt), inbound audio and stop event are
+sent with their original pacing divided by --speed. The replay gets fresh
+CallSid and StreamSid values and no business_url, so the relay treats it as a
+new call that isn't tied to any business: nothing about the original business
+is overwritten and no second recording is appended to the original's file. Whatever the
+relay sends back is timed, and time to first audio and clear events are
+reported next to the numbers from the original recording.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import time
+import uuid
+from collections import Counter
+
+import websockets
+
+from server.recording import EVENT_RELAY, EVENT_TWILIO, MEDIA_INBOUND, MEDIA_OUTBOUND, read_recording, replay
+
+
+def summarize(path: str) -> dict:
+  counts = Counter()
+  first_audio = None
+  duration = 0.0
+  for elapsed, kind, payload in read_recording(path):
+    counts[kind] += 1
+    duration = elapsed
+    if kind == MEDIA_OUTBOUND and first_audio is None:
+      first_audio = elapsed
+    if kind == EVENT_RELAY and json.loads(payload).get("event") == "clear":
+      counts["clear"] += 1
+  return {
+    "duration": duration,
+    "inbound_frames": counts[MEDIA_INBOUND],
+    "outbound_frames": counts[MEDIA_OUTBOUND],
+    "clears": counts["clear"],
+    "first_audio": first_audio,
+  }
+
+
+def detach_from_call(message: dict, call_sid: str, stream_sid: str) -> dict:
+  """Point a recorded Twilio event at the replay's own call, with no business attached."""
+  message = json.loads(json.dumps(message))
+  if "streamSid" in message:
+    message["streamSid"] = stream_sid
+  for key in ("start", "stop"):
+    if key in message:
+      for field, value in (("streamSid", stream_sid), ("callSid", call_sid)):
+        if field in message[key]:
+          message[key][field] = value
+  if "start" in message:
+    message["start"].get("customParameters", {}).pop("business_url", None)
+  return message
+
+
+async def replay_into_relay(path: str, url: str, speed: float) -> dict:
+  counts = Counter()
+  first_audio = None
+  replay_id = uuid.uuid4().hex
+  call_sid, stream_sid = f"CAreplay{replay_id}", f"MZreplay{replay_id}"
+  async with websockets.connect(url) as ws:
+    started = time.monotonic()
+
+    async def send(kind: int, payload: bytes):
+      if kind == MEDIA_INBOUND:
+        await ws.send(json.dumps({
+          "event": "media",
+          "streamSid": stream_sid,
+          "media": {"payload": base64.b64encode(payload).decode()},
+        }))
+      else:
+        await ws.send(json.dumps(detach_from_call(json.loads(payload), call_sid, stream_sid)))
+
+    async def receive():
+      nonlocal first_audio
+      async for raw in ws:
+        message = json.loads(raw)
+        counts[message.get("event")] += 1
+        if message.get("event") == "media" and first_audio is None:
+          first_audio = time.monotonic() - started
+
+    receiver = asyncio.create_task(receive())
+    await replay(path, send, speed, kinds={MEDIA_INBOUND, EVENT_TWILIO})
+    # Let the relay finish answering the last thing it heard
+    await asyncio.sleep(2)
+    receiver.cancel()
+
+  return {
+    "duration": time.monotonic() - started,
+    "outbound_frames": counts["media"],
+    "clears": counts["clear"],
+    "first_audio": first_audio,
+  }
+
+
+def print_summary(label: str, summary: dict):
+  first_audio = f"{summary['first_audio']:.3f} s" if summary["first_audio"] is not None else "-"
+  print(
+    f"{label:<10} duration {summary['duration']:8.2f} s  outbound frames {summary['outbound_frames']:6}"
+    f"  clears {summary['clears']:4}  first audio {first_audio}"
+  )
+
+
+async def main(path: str, url: str, speed: float, summary_only: bool):
+  print_summary("recorded", summarize(path))
+  if not summary_only:
+    print_summary("replayed", await replay_into_relay(path, url, speed))
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser()
+  parser.add_argument("recording")
+  parser.add_argument("--url", default="ws://localhost:8080/outbound-media-stream")
+  parser.add_argument("--speed", type=float, default=1.0, help="pacing multiplier, 0 for no pacing")
+  parser.add_argument("--summary", action="store_true", help="only summarize the recording")
+  args = parser.parse_args()
+  asyncio.run(main(args.recording, args.url, args.speed, args.summary))
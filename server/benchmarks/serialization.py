@@ -0,0 +1,65 @@
+"""
+Compare the per-item pydantic path with the TypeAdapter / ORJSON path.
+
+  python -m benchmarks.serialization [count]
+"""
+import json
+import sys
+import time
+from typing import Callable
+
+import orjson
+
+from server.models import Business, FindBusinessesResult
+from server.serialization import (
+  businesses_from_rows,
+  dump_businesses,
+  dump_find_businesses_result,
+  find_businesses_result_adapter,
+)
+
+
+def best_of(fn: Callable[[], object], repeat: int = 5) -> float:
+  timings = []
+  for _ in range(repeat):
+    started = time.perf_counter()
+    fn()
+    timings.append(time.perf_counter() - started)
+  return min(timings)
+
+
+def report(label: str, baseline: float, fast: float):
+  print(f"{label:<28} {baseline * 1000:9.2f} ms {fast * 1000:9.2f} ms {baseline / fast:6.1f}x")
+
+
+def main(count: int = 10_000):
+  rows = [
+    {
+      "id": i,
+      "name": f"Business {i}",
+      "url": f"https://business-{i}.example.com",
+      "phone_number": 4155550000 + i,
+      "notes": "Quoted over the phone" if i % 2 else None,
+      "quote": 100.0 + i if i % 3 else None,
+      "conversation_id": f"conv_{i}" if i % 4 else None,
+    }
+    for i in range(count)
+  ]
+  businesses = [Business(**{k: v for k, v in row.items() if k != "id"}) for row in rows]
+  result = FindBusinessesResult(businesses=businesses)
+  raw = result.model_dump_json()
+
+  print(f"{count} businesses{'':<14} {'baseline':>12} {'fast':>12}")
+  report("dump for upsert", best_of(lambda: [b.model_dump() for b in businesses]), best_of(lambda: dump_businesses(businesses)))
+  report("load database rows", best_of(lambda: [Business(**row) for row in rows]), best_of(lambda: businesses_from_rows(rows)))
+  report("construct database rows", best_of(lambda: [Business.model_construct(**row) for row in rows]), best_of(lambda: businesses_from_rows(rows)))
+  report("parse agent result", best_of(lambda: FindBusinessesResult.model_validate_json(raw)), best_of(lambda: find_businesses_result_adapter.validate_json(raw)))
+  report(
+    "encode response",
+    best_of(lambda: json.dumps({"result": result.model_dump()}).encode()),
+    best_of(lambda: orjson.dumps({"result": dump_find_businesses_result(result)})),
+  )
+
+
+if __name__ == "__main__":
+  main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
@@ -1 +1,5 @@
-from .main import start
\ No newline at end of file
+def start():
+  # Imported lazily so submodules can be used (e.g. by benchmarks) without
+  # loading the app and its required environment variables.
+  from .main import start as run_server
+  run_server()
@@ -0,0 +1,210 @@
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .models import Business
+
+# Relative accuracy of quote percentiles
+SKETCH_ALPHA = 0.01
+_GAMMA = (1 + SKETCH_ALPHA) / (1 - SKETCH_ALPHA)
+_LOG_GAMMA = math.log(_GAMMA)
+
+PERCENTILES = (0.25, 0.5, 0.75, 0.9)
+
+AggregateKey = Tuple[str, str]
+
+
+def aggregate_key(service: Optional[str], county: Optional[str]) -> AggregateKey:
+  return ((service or "").strip().lower(), (county or "").strip().lower())
+
+
+class QuoteSketch:
+  """
+  Log-bucketed quantile sketch: every value lands in a bucket whose bounds are
+  within SKETCH_ALPHA of each other, so percentiles carry at most that relative
+  error while memory grows only with the spread of quotes, not their number.
+  """
+  def __init__(self):
+    self.buckets: Dict[int, int] = {}
+    self.zero_count = 0
+    self.count = 0
+
+  def add(self, value: float, count: int = 1):
+    self.count += count
+    if value <= 0:
+      self.zero_count += count
+      return
+    index = math.ceil(math.log(value) / _LOG_GAMMA)
+    self.buckets[index] = self.buckets.get(index, 0) + count
+
+  def remove(self, value: float):
+    self.count -= 1
+    if value <= 0:
+      self.zero_count -= 1
+      return
+    index = math.ceil(math.log(value) / _LOG_GAMMA)
+    self.buckets[index] -= 1
+    if not self.buckets[index]:
+      del self.buckets[index]
+
+  def quantile(self, q: float) -> Optional[float]:
+    if not self.count:
+      return None
+    rank = q * (self.count - 1)
+    seen = self.zero_count
+    if rank < seen:
+      return 0.0
+    for index in sorted(self.buckets):
+      seen += self.buckets[index]
+      if rank < seen:
+        # Midpoint of the bucket (gamma^(i-1), gamma^i]
+        return 2 * _GAMMA ** index / (_GAMMA + 1)
+    return 2 * _GAMMA ** max(self.buckets) / (_GAMMA + 1)
+
+
+class QuoteAggregate:
+  """Running quote statistics for one service in one county."""
+  def __init__(self):
+    self.count = 0
+    self.total = 0.0
+    self.min: Optional[float] = None
+    self.max: Optional[float] = None
+    self.sketch = QuoteSketch()
+    self.discount_answers = 0
+    self.discounts_accepted = 0
+    self._snapshot: Optional[dict] = None
+
+  def add(self, quote: float, discount_accepted: Optional[bool] = None):
+    self.count += 1
+    self.total += quote
+    self.min = quote if self.min is None else min(self.min, quote)
+    self.max = quote if self.max is None else max(self.max, quote)
+    self.sketch.add(quote)
+    if discount_accepted is not None:
+      self.discount_answers += 1
+      self.discounts_accepted += int(discount_accepted)
+    self._snapshot = None
+
+  def remove(self, quote: float, discount_accepted: Optional[bool] = None) -> bool:
+    """Take back a quote added earlier. Returns True if min or max must be recomputed."""
+    self.count -= 1
+    self.total -= quote
+    self.sketch.remove(quote)
+    if discount_accepted is not None:
+      self.discount_answers -= 1
+      self.discounts_accepted -= int(discount_accepted)
+    self._snapshot = None
+    return quote == self.min or quote == self.max
+
+  def snapshot(self) -> dict:
+    # Cached until the next quote arrives, so reads don't walk the sketch
+    if self._snapshot is None:
+      self._snapshot = {
+        "count": self.count,
+        "min": self.min,
+        "max": self.max,
+        "mean": self.total / self.count if self.count else None,
+        "percentiles": {f"p{round(q * 100)}": self.sketch.quantile(q) for q in PERCENTILES},
+        "discount_acceptance_rate": (
+          self.discounts_accepted / self.discount_answers if self.discount_answers else None
+        ),
+      }
+    return self._snapshot
+
+
+class QuoteAggregates:
+  """Quote statistics keyed by (service, county), updated as quotes are recorded."""
+  def __init__(self):
+    self.aggregates: Dict[AggregateKey, QuoteAggregate] = {}
+    self.built = False
+    # The values each URL currently contributes, so a re-quote replaces rather than adds
+    self._recorded: Dict[str, Tuple[AggregateKey, float, Optional[bool]]] = {}
+
+  def record(self, businesses: List[Business]):
+    """Fold quoted businesses into the running statistics, replacing any earlier quote for the same URL."""
+    for business in businesses:
+      if business.quote is None:
+        continue
+      entry = (aggregate_key(business.service, business.county), business.quote, business.discount_accepted)
+      previous = self._recorded.get(business.url)
+      if previous == entry:
+        continue
+      self._recorded[business.url] = entry
+      if previous:
+        self._remove(*previous)
+      key, quote, discount_accepted = entry
+      aggregate = self.aggregates.get(key)
+      if aggregate is None:
+        aggregate = self.aggregates[key] = QuoteAggregate()
+      aggregate.add(quote, discount_accepted)
+
+  def _remove(self, key: AggregateKey, quote: float, discount_accepted: Optional[bool]):
+    aggregate = self.aggregates[key]
+    bounds_changed = aggregate.remove(quote, discount_accepted)
+    if not aggregate.count:
+      del self.aggregates[key]
+    elif bounds_changed:
+      quotes = [value for entry_key, value, _ in self._recorded.values() if entry_key == key]
+      aggregate.min, aggregate.max = min(quotes), max(quotes)
+
+  def get(self, service: str, county: str) -> Optional[dict]:
+    aggregate = self.aggregates.get(aggregate_key(service, county))
+    return aggregate.snapshot() if aggregate else None
+
+  def all(self) -> List[dict]:
+    return [
+      {"service": service, "county": county, **aggregate.snapshot()}
+      for (service, county), aggregate in self.aggregates.items()
+    ]
+
+  def rebuild(self, rows: List[dict]):
+    """Replace all statistics with ones computed from quoted business rows in one vectorized pass."""
+    aggregates: Dict[AggregateKey, QuoteAggregate] = {}
+    rows = [row for row in rows if row.get("quote") is not None]
+    keys = [aggregate_key(row.get("service"), row.get("county")) for row in rows]
+    if rows:
+      unique_keys, group = np.unique(np.array(["\x1f".join(key) for key in keys]), return_inverse=True)
+      quotes = np.array([row["quote"] for row in rows], dtype=np.float64)
+      discount = np.array(
+        [np.nan if row.get("discount_accepted") is None else float(row["discount_accepted"]) for row in rows]
+      )
+      groups = len(unique_keys)
+
+      counts = np.bincount(group, minlength=groups)
+      totals = np.bincount(group, weights=quotes, minlength=groups)
+      mins = np.full(groups, np.inf)
+      np.minimum.at(mins, group, quotes)
+      maxs = np.full(groups, -np.inf)
+      np.maximum.at(maxs, group, quotes)
+      answered = ~np.isnan(discount)
+      discount_answers = np.bincount(group[answered], minlength=groups)
+      discounts_accepted = np.bincount(group[answered], weights=discount[answered], minlength=groups)
+
+      positive = quotes > 0
+      zero_counts = np.bincount(group[~positive], minlength=groups)
+      bucket_index = np.ceil(np.log(quotes[positive]) / _LOG_GAMMA).astype(np.int64)
+      pairs, pair_counts = np.unique(
+        np.stack([group[positive], bucket_index], axis=1), axis=0, return_counts=True
+      )
+
+      key_tuples = [tuple(str(joined).split("\x1f")) for joined in unique_keys]
+      for i, key in enumerate(key_tuples):
+        aggregate = QuoteAggregate()
+        aggregate.count = int(counts[i])
+        aggregate.total = float(totals[i])
+        aggregate.min = float(mins[i])
+        aggregate.max = float(maxs[i])
+        aggregate.discount_answers = int(discount_answers[i])
+        aggregate.discounts_accepted = int(discounts_accepted[i])
+        aggregate.sketch.count = int(counts[i])
+        aggregate.sketch.zero_count = int(zero_counts[i])
+        aggregates[key] = aggregate
+      for (i, index), count in zip(pairs.tolist(), pair_counts.tolist()):
+        aggregates[key_tuples[i]].sketch.buckets[index] = count
+
+    self.aggregates = aggregates
+    self._recorded = {
+      row["url"]: (key, float(row["quote"]), row.get("discount_accepted")) for row, key in zip(rows, keys)
+    }
+    self.built = True
@@ -0,0 +1,198 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl
+
+from .dedup import normalize_phone
+
+MAX_ACTIVE_CALLS = int(os.getenv("MAX_ACTIVE_CALLS", "10"))
+MAX_CALL_ATTEMPTS = int(os.getenv("MAX_CALL_ATTEMPTS", "2"))
+CALL_RETRY_DELAY = float(os.getenv("CALL_RETRY_DELAY", "300"))
+# Calls that never reported a final status stop holding capacity after this long
+STALE_CALL_TIMEOUT = float(os.getenv("STALE_CALL_TIMEOUT", "3600"))
+# How many finished calls to remember, so late or duplicate callbacks are recognised
+MAX_FINISHED_CALLS = 10_000
+# Callbacks can arrive before calls.create returns; they're held this long for the call to be registered
+EARLY_CALLBACK_TTL = 60
+MAX_EARLY_CALLBACKS = 1000
+# After the media stream closes, how long to wait for Twilio's final status before ending the call ourselves
+CALL_STATUS_GRACE = float(os.getenv("CALL_STATUS_GRACE", "30"))
+
+# Twilio call statuses in the order a call moves through them
+PROGRESS_STATES = ("queued", "initiated", "ringing", "in-progress")
+TERMINAL_STATES = {"completed", "busy", "no-answer", "failed", "canceled"}
+# Outcomes worth calling back about later
+RETRY_STATES = {"busy", "no-answer", "failed"}
+
+STATUS_CALLBACK_EVENTS = ["initiated", "ringing", "answered", "completed"]
+
+
+def parse_status_callback(body: bytes) -> Dict[str, str]:
+  """
+  Decode a status callback's form body. Blank fields (FromZip=, CallerCity=,
+  ...) are kept: Twilio's signature covers every posted key, empty or not.
+  """
+  return dict(parse_qsl(body.decode(), keep_blank_values=True))
+
+
+class CallRequest:
+  """Everything needed to place (or re-place) a call to one business."""
+  def __init__(self, business_url: str, business_number: str, twiml_url: str, status_callback_url: str):
+    self.business_url = business_url
+    self.business_number = business_number
+    self.twiml_url = twiml_url
+    self.status_callback_url = status_callback_url
+
+
+class CallRecord:
+  def __init__(self, call_sid: str, request: CallRequest, attempt: int = 1):
+    self.call_sid = call_sid
+    self.request = request
+    self.attempt = attempt
+    self.state = "queued"
+    self.history: List[Tuple[str, float]] = [(self.state, time.time())]
+
+  @property
+  def terminal(self) -> bool:
+    return self.state in TERMINAL_STATES
+
+  def advance(self, state: str) -> bool:
+    """
+    Move to a new state. Twilio doesn't guarantee callback order, so anything
+    that would move a call backwards, or out of a terminal state, is ignored.
+    """
+    if self.terminal or state == self.state:
+      return False
+    if state not in TERMINAL_STATES:
+      if state not in PROGRESS_STATES or PROGRESS_STATES.index(state) < PROGRESS_STATES.index(self.state):
+        return False
+    self.state = state
+    self.history.append((state, time.time()))
+    return True
+
+  def snapshot(self) -> dict:
+    return {
+      "call_sid": self.call_sid,
+      "business_url": self.request.business_url,
+      "attempt": self.attempt,
+      "state": self.state,
+      "history": self.history,
+    }
+
+
+class CallTracker:
+  """
+  Per-call state machines driven by Twilio status callbacks, plus the outbound
+  call capacity they hold. A slot is reserved before a call is placed, so
+  concurrent requests can't overshoot the limit while calls.create runs.
+  """
+  def __init__(self, max_active: int = MAX_ACTIVE_CALLS):
+    self.max_active = max_active
+    self.active = 0
+    # Run in the background whenever a call reaches a terminal state, however it got there
+    self.on_call_ended: Optional[Callable[[CallRecord], Awaitable[None]]] = None
+    self.calls: "OrderedDict[str, CallRecord]" = OrderedDict()
+    self.outcomes: dict = {}
+    self._early: "OrderedDict[str, Tuple[float, List[str]]]" = OrderedDict()
+    # Numbers with a reserved slot whose call hasn't been registered yet
+    self._dialing: Set[str] = set()
+    self._tasks: Set[asyncio.Task] = set()
+
+  def reserve(self, business_number: str) -> bool:
+    """Take a slot for a call about to be placed. Pair with register(), or release() if placing fails."""
+    self._expire_stale()
+    if self.active >= self.max_active:
+      return False
+    self.active += 1
+    self._dialing.add(normalize_phone(business_number) or business_number)
+    return True
+
+  def release(self, business_number: str):
+    self.active -= 1
+    self._dialing.discard(normalize_phone(business_number) or business_number)
+
+  def call_in_progress(self, business_number: str) -> bool:
+    """Whether a call to this number is being placed or hasn't ended yet."""
+    phone = normalize_phone(business_number) or business_number
+    if phone in self._dialing:
+      return True
+    return any(
+      not record.terminal and (normalize_phone(record.request.business_number) or record.request.business_number) == phone
+      for record in self.calls.values()
+    )
+
+  def register(self, call_sid: str, request: CallRequest, attempt: int = 1) -> CallRecord:
+    """
+    Track a newly placed call in its reserved slot, applying any callbacks that
+    arrived before it was registered.
+    """
+    record = CallRecord(call_sid, request, attempt)
+    self.calls[call_sid] = record
+    self._dialing.discard(normalize_phone(request.business_number) or request.business_number)
+    _, states = self._early.pop(call_sid, (0.0, []))
+    for state in states:
+      self.update(call_sid, state)
+    return record
+
+  def update(self, call_sid: str, state: str) -> Optional[CallRecord]:
+    """Apply a status callback. Returns the record if its state changed."""
+    record = self.calls.get(call_sid)
+    if record is None:
+      self._hold_early(call_sid, state)
+      return None
+    if not record.advance(state):
+      return None
+    if record.terminal:
+      # Free the slot as soon as the call ends, not when post-processing does
+      self.active -= 1
+      self.outcomes[state] = self.outcomes.get(state, 0) + 1
+      self.calls.move_to_end(call_sid)
+      self._prune()
+      if self.on_call_ended:
+        self.spawn(self.on_call_ended(record))
+    return record
+
+  def spawn(self, coro: Awaitable[None]):
+    """Run follow-up work in the background, keeping a reference until it finishes."""
+    task = asyncio.create_task(coro)
+    self._tasks.add(task)
+    task.add_done_callback(self._tasks.discard)
+
+  def _hold_early(self, call_sid: str, state: str):
+    now = time.time()
+    while self._early:
+      oldest_sid, (received, _) = next(iter(self._early.items()))
+      if received > now - EARLY_CALLBACK_TTL and len(self._early) < MAX_EARLY_CALLBACKS:
+        break
+      del self._early[oldest_sid]
+    self._early.setdefault(call_sid, (now, []))[1].append(state)
+
+  def _expire_stale(self):
+    cutoff = time.time() - STALE_CALL_TIMEOUT
+    for record in list(self.calls.values()):
+      if not record.terminal and record.history[0][1] < cutoff:
+        print(f"[CallLifecycle] No final status for {record.call_sid}, releasing its slot")
+        self.update(record.call_sid, "canceled")
+
+  def _prune(self):
+    finished = len(self.calls) - self.active
+    for call_sid in list(self.calls):
+      if finished <= MAX_FINISHED_CALLS:
+        break
+      if self.calls[call_sid].terminal:
+        del self.calls[call_sid]
+        finished -= 1
+
+  def snapshot(self) -> dict:
+    return {
+      "active": self.active,
+      "max_active": self.max_active,
+      "pending_tasks": len(self._tasks),
+      "outcomes": dict(self.outcomes),
+      "calls": [record.snapshot() for record in self.calls.values() if not record.terminal],
+    }
+
+
+call_tracker = CallTracker()
@@ -0,0 +1,185 @@
+import asyncio
+import json
+import os
+import resource
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from fastapi import WebSocket
+
+from .downlink import DownlinkQueue
+from .recording import CallRecorder
+
+CALL_IDLE_TIMEOUT = float(os.getenv("CALL_IDLE_TIMEOUT", "30"))
+CALL_MAX_DURATION = float(os.getenv("CALL_MAX_DURATION", "900"))
+CALL_QUEUE_SIZE = int(os.getenv("CALL_QUEUE_SIZE", "256"))
+# Longest we let queued agent audio (usually the goodbye) play out once the call ends normally
+CALL_DRAIN_TIMEOUT = float(os.getenv("CALL_DRAIN_TIMEOUT", "10"))
+# Endings after which queued agent audio is still worth playing; anything else discards it
+DRAIN_REASONS = {"elevenlabs_closed", "twilio_stop"}
+
+
+class SessionEnded(Exception):
+  """Raised by a task in a call session to stop every other task in it."""
+  def __init__(self, reason: str):
+    super().__init__(reason)
+    self.reason = reason
+
+
+class CallStats:
+  """Process-wide accounting of call sessions, used to spot leaks under load."""
+  def __init__(self):
+    self.active = 0
+    self.peak_active = 0
+    self.started = 0
+    self.finished = 0
+    self.end_reasons: Dict[str, int] = {}
+
+  def opened(self):
+    self.started += 1
+    self.active += 1
+    self.peak_active = max(self.peak_active, self.active)
+
+  def closed(self, reason: str):
+    self.finished += 1
+    self.active -= 1
+    self.end_reasons[reason] = self.end_reasons.get(reason, 0) + 1
+
+  def snapshot(self) -> dict:
+    return {
+      "active": self.active,
+      "peak_active": self.peak_active,
+      "started": self.started,
+      "finished": self.finished,
+      "end_reasons": dict(self.end_reasons),
+      **process_resources(),
+    }
+
+
+call_stats = CallStats()
+
+
+def process_resources() -> dict:
+  """Current RSS and open file descriptor count for this process."""
+  try:
+    with open("/proc/self/statm") as f:
+      rss_bytes = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    open_fds = len(os.listdir("/proc/self/fd"))
+  except OSError:
+    # Not on Linux, fall back to the peak RSS (reported in KB)
+    rss_bytes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    open_fds = None
+  return {"rss_bytes": rss_bytes, "open_fds": open_fds}
+
+
+class CallSession:
+  """
+  Owns every task and socket belonging to one call. The Twilio reader, the
+  ElevenLabs reader, one writer per direction (the Twilio one paced by the
+  downlink queue) and a timeout watchdog all run in a single task group, so
+  when any of them finishes or fails the rest are cancelled and both sockets
+  are closed. When the agent hangs up or Twilio stops the stream, queued audio
+  is played out first (up to drain_timeout); errors and timeouts drop it.
+  """
+  def __init__(
+    self,
+    websocket: WebSocket,
+    idle_timeout: float = CALL_IDLE_TIMEOUT,
+    max_duration: float = CALL_MAX_DURATION,
+    queue_size: int = CALL_QUEUE_SIZE,
+    drain_timeout: float = CALL_DRAIN_TIMEOUT,
+  ):
+    self.websocket = websocket
+    self.elevenlabs_ws = None
+    self.recorder: Optional[CallRecorder] = None
+    self.idle_timeout = idle_timeout
+    self.max_duration = max_duration
+    self.drain_timeout = drain_timeout
+    self.end_reason: Optional[str] = None
+    self.downlink = DownlinkQueue(websocket.send_json)
+    self.to_elevenlabs: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    self._group: Optional[asyncio.TaskGroup] = None
+    self._started_at = time.monotonic()
+    self._last_activity = self._started_at
+
+  def touch(self):
+    """Record inbound traffic on either socket, resetting the idle timer."""
+    self._last_activity = time.monotonic()
+
+  async def send_audio(self, payload: str):
+    await self.downlink.push_audio(payload)
+
+  def interrupt(self):
+    """Drop unplayed agent audio and clear Twilio's buffer."""
+    self.downlink.flush()
+
+  async def send_to_elevenlabs(self, message: dict):
+    await self.to_elevenlabs.put(message)
+
+  def attach_elevenlabs(self, elevenlabs_ws, reader: Callable[[], Awaitable[None]]):
+    """Start the ElevenLabs reader and writer once the upstream socket is open."""
+    self.elevenlabs_ws = elevenlabs_ws
+    self._group.create_task(self._until_done(reader(), "elevenlabs_closed"))
+    self._group.create_task(self._elevenlabs_writer())
+
+  async def run(self, twilio_reader: Callable[[], Awaitable[None]]):
+    call_stats.opened()
+    try:
+      async with asyncio.TaskGroup() as group:
+        self._group = group
+        group.create_task(self._until_done(twilio_reader(), "twilio_closed"))
+        group.create_task(self.downlink.run())
+        group.create_task(self._watchdog())
+    except* SessionEnded as eg:
+      self.end_reason = eg.exceptions[0].reason
+    except* Exception as eg:
+      self.end_reason = self.end_reason or "error"
+      print(f"[CallSession] Error: {eg.exceptions[0]!r}")
+    finally:
+      self.end_reason = self.end_reason or "cancelled"
+      await self.close()
+      call_stats.closed(self.end_reason)
+      print(f"[CallSession] Ended ({self.end_reason})")
+
+  async def close(self):
+    self._group = None
+    self.downlink.discard()
+    while not self.to_elevenlabs.empty():
+      self.to_elevenlabs.get_nowait()
+    if self.elevenlabs_ws:
+      try:
+        await self.elevenlabs_ws.close()
+      except Exception:
+        pass
+    try:
+      await self.websocket.close()
+    except Exception:
+      pass
+    if self.recorder:
+      try:
+        await self.recorder.close()
+      except Exception as e:
+        print(f"[CallSession] Failed to finish recording: {e}")
+
+  async def _until_done(self, coro: Awaitable[None], reason: str):
+    try:
+      await coro
+    except SessionEnded as e:
+      reason = e.reason
+    if reason in DRAIN_REASONS and not await self.downlink.drain(self.drain_timeout):
+      print(f"[CallSession] Agent audio still queued after {self.drain_timeout}s, dropping it")
+    raise SessionEnded(reason)
+
+  async def _elevenlabs_writer(self):
+    while True:
+      message = await self.to_elevenlabs.get()
+      await self.elevenlabs_ws.send(json.dumps(message))
+
+  async def _watchdog(self):
+    while True:
+      await asyncio.sleep(1)
+      now = time.monotonic()
+      if now - self._last_activity > self.idle_timeout:
+        raise SessionEnded("idle_timeout")
+      if now - self._started_at > self.max_duration:
+        raise SessionEnded("max_duration")
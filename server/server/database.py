@@ -3,6 +3,9 @@ from typing import List, Optional, Tuple, Union, Dict
 from supabase import create_client, Client
 import os
 from .models import FindBusinessesResult, Business
+from .aggregates import QuoteAggregates
+from .dedup import BusinessIndex
+from .serialization import businesses_from_rows, dump_businesses
 from dotenv import load_dotenv
 from typing import Optional
 
@@ -13,6 +16,8 @@ class Database:
     supabase_url = os.environ.get("SUPABASE_URL")
     supabase_key = os.environ.get("SUPABASE_KEY")
     self.supabase = create_client(supabase_url, supabase_key)
+    self.quote_aggregates = QuoteAggregates()
+    self.business_index = BusinessIndex()
   
   def get_business(self, business_url: str = None, conversation_id: str = None) -> Optional[Business]:
     if conversation_id:
@@ -21,14 +26,35 @@ class Database:
       response = self.supabase.table("businesses").select("*").eq("url", business_url).execute()
     else:
       raise ValueError("Either business_url or conversation_id must be provided")
-    return Business(**response.data[0]) if response.data else None
+    return businesses_from_rows(response.data[:1])[0] if response.data else None
 
   def upsert_businesses(self, businesses: List[Business]) -> Optional[List[Business]]:
-    business_dicts = [business.model_dump() for business in businesses]
+    business_dicts = dump_businesses(businesses)
     
     response = (
       self.supabase.table("businesses")
       .upsert(business_dicts, on_conflict="url")
       .execute()
     )
-    return response.data
\ No newline at end of file
+    self.quote_aggregates.record(businesses)
+    return response.data
+
+  def select_all_businesses(self, columns: str, quoted_only: bool = False, page_size: int = 1000) -> List[dict]:
+    """Page through the businesses table, ordered by url so pages are stable."""
+    rows = []
+    while True:
+      query = self.supabase.table("businesses").select(columns)
+      if quoted_only:
+        query = query.not_.is_("quote", "null")
+      response = query.order("url").range(len(rows), len(rows) + page_size - 1).execute()
+      rows.extend(response.data)
+      if len(response.data) < page_size:
+        return rows
+
+  def rebuild_quote_aggregates(self):
+    self.quote_aggregates.rebuild(
+      self.select_all_businesses("url,service,county,quote,discount_accepted", quoted_only=True)
+    )
+
+  def rebuild_business_index(self) -> int:
+    return self.business_index.rebuild(self.select_all_businesses("url,phone_number,conversation_id"))
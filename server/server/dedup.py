@@ -0,0 +1,162 @@
+import os
+import re
+import time
+from typing import Dict, List, Optional, Set, Tuple, Union
+from urllib.parse import urlsplit
+
+from .models import Business
+
+# Hosts shared by many businesses, where the first path segment identifies the business
+SHARED_HOSTS = {"facebook.com", "sites.google.com", "instagram.com", "linktr.ee", "business.site"}
+# Directories, aggregators and search engines: each listing's full path identifies a business
+AGGREGATOR_HOSTS = {
+  "yelp.com", "angi.com", "angieslist.com", "homeadvisor.com", "thumbtack.com", "yellowpages.com",
+  "bbb.org", "nextdoor.com", "houzz.com", "mapquest.com", "manta.com", "porch.com", "superpages.com",
+  "google.com", "bing.com", "duckduckgo.com", "yahoo.com", "wikipedia.org", "youtube.com",
+}
+
+# Seconds before the index is rebuilt from the table, so rows deleted elsewhere
+# (e.g. by the client through Supabase) stop suppressing results and calls
+BUSINESS_INDEX_MAX_AGE = float(os.getenv("BUSINESS_INDEX_MAX_AGE", "300"))
+
+_NON_DIGITS = re.compile(r"\D")
+
+
+def is_aggregator_host(host: str) -> bool:
+  return host in AGGREGATOR_HOSTS or any(host.endswith(f".{aggregator}") for aggregator in AGGREGATOR_HOSTS)
+
+
+def normalize_host(url: str) -> Optional[str]:
+  """
+  Reduce a URL to the part that identifies a business: its host without
+  www/port, plus the first path segment on shared hosts or the whole path on
+  aggregators.
+  """
+  if not url:
+    return None
+  parts = urlsplit(url if "//" in url else f"//{url}")
+  host = (parts.hostname or "").lower().rstrip(".")
+  if host.startswith("www."):
+    host = host[4:]
+  if not host:
+    return None
+  if host in SHARED_HOSTS:
+    segment = parts.path.strip("/").split("/", 1)[0].lower()
+    return f"{host}/{segment}" if segment else host
+  if is_aggregator_host(host):
+    path = parts.path.rstrip("/").lower()
+    return f"{host}{path}" if path else host
+  return host
+
+
+def normalize_phone(number: Union[int, str, None]) -> Optional[str]:
+  """Format a phone number as E.164, assuming North American numbers when no country code is given."""
+  if number is None:
+    return None
+  digits = _NON_DIGITS.sub("", str(number))
+  if len(digits) == 10:
+    return f"+1{digits}"
+  if len(digits) == 11 and digits.startswith("1"):
+    return f"+{digits}"
+  if 8 <= len(digits) <= 15:
+    return f"+{digits}"
+  return None
+
+
+class BusinessIndex:
+  """
+  Maps normalized hosts and E.164 phone numbers to the URL a business was first
+  stored under, so the same business found under another URL can be skipped.
+  Entries are never removed individually; the index is rebuilt from the table
+  once it is older than max_age.
+  """
+  def __init__(self, max_age: float = BUSINESS_INDEX_MAX_AGE):
+    self.max_age = max_age
+    self.built_at = 0.0
+    self.by_host: Dict[str, str] = {}
+    self.by_phone: Dict[str, str] = {}
+    self.called_phones: Set[str] = set()
+    self.built = False
+    self.duplicates_in_table = 0
+    self.duplicate_results_avoided = 0
+    self.duplicate_calls_avoided = 0
+
+  @property
+  def stale(self) -> bool:
+    return not self.built or time.monotonic() - self.built_at > self.max_age
+
+  def find(self, url: str, phone_number: Union[int, str, None]) -> Optional[str]:
+    """Return the canonical URL of a known business matching either key, if any."""
+    host = normalize_host(url)
+    if host and host in self.by_host:
+      return self.by_host[host]
+    phone = normalize_phone(phone_number)
+    if phone and phone in self.by_phone:
+      return self.by_phone[phone]
+    return None
+
+  def add(self, url: str, phone_number: Union[int, str, None]):
+    host = normalize_host(url)
+    if host:
+      self.by_host.setdefault(host, url)
+    phone = normalize_phone(phone_number)
+    if phone:
+      self.by_phone.setdefault(phone, url)
+
+  def merge(self, businesses: List[Business]) -> Tuple[List[Business], int]:
+    """
+    Index new businesses from a search and return the ones that weren't already
+    known, along with how many duplicates were dropped. A business found again
+    under its own URL is kept so its record gets refreshed.
+    """
+    unique = []
+    duplicates = 0
+    for business in businesses:
+      canonical = self.find(business.url, business.phone_number)
+      if canonical is not None and canonical != business.url:
+        duplicates += 1
+        continue
+      self.add(business.url, business.phone_number)
+      unique.append(business)
+    self.duplicate_results_avoided += duplicates
+    return unique, duplicates
+
+  def was_called(self, phone_number: Union[int, str, None]) -> bool:
+    phone = normalize_phone(phone_number)
+    return phone is not None and phone in self.called_phones
+
+  def mark_called(self, phone_number: Union[int, str, None]):
+    phone = normalize_phone(phone_number)
+    if phone:
+      self.called_phones.add(phone)
+
+  def rebuild(self, rows: List[dict]) -> int:
+    """
+    Rebuild from business rows (url, phone_number, conversation_id) in table
+    order and return how many rows duplicate an earlier one.
+    """
+    self.by_host = {}
+    self.by_phone = {}
+    self.called_phones = set()
+    duplicates = 0
+    for row in rows:
+      if self.find(row["url"], row.get("phone_number")) not in (None, row["url"]):
+        duplicates += 1
+      self.add(row["url"], row.get("phone_number"))
+      if row.get("conversation_id"):
+        self.mark_called(row.get("phone_number"))
+    self.duplicates_in_table = duplicates
+    self.built = True
+    self.built_at = time.monotonic()
+    return duplicates
+
+  def stats(self) -> dict:
+    return {
+      "hosts": len(self.by_host),
+      "phones": len(self.by_phone),
+      "called_phones": len(self.called_phones),
+      "duplicates_in_table": self.duplicates_in_table,
+      "duplicate_results_avoided": self.duplicate_results_avoided,
+      "duplicate_calls_avoided": self.duplicate_calls_avoided,
+      "age": time.monotonic() - self.built_at if self.built else None,
+    }
@@ -0,0 +1,263 @@
+import asyncio
+import os
+import re
+from html.parser import HTMLParser
+from typing import List, Optional, Protocol, Tuple
+from urllib.parse import parse_qs, quote_plus, urlsplit
+
+import httpx
+
+from baml_client import b as baml
+from .dedup import is_aggregator_host, normalize_host
+from .models import Business, FindBusinessesResult
+from .resilience import UpstreamError, openai_chat_provider, openai_provider, search_provider
+
+# Results page URL for the HTTP search backend. {query} is URL-encoded, {page} counts
+# from 0 and {offset} is the index of the page's first result
+SEARCH_URL_TEMPLATE = os.getenv("SEARCH_URL_TEMPLATE", "https://html.duckduckgo.com/html/?q={query}&s={offset}")
+SEARCH_PAGES = int(os.getenv("SEARCH_PAGES", "3"))
+RESULTS_PER_PAGE = 30
+MAX_BUSINESSES = 10
+
+_PHONE = re.compile(r"(?<!\d)(?:\+?1[\s.-]?)?\(?(\d{3})\)?[\s.-]?(\d{3})[\s.-]?(\d{4})(?!\d)")
+_URL_LIKE = re.compile(r"^(https?://|www\.)|\.(com|net|org|biz|us)\b", re.IGNORECASE)
+# Separators search result titles put between the site name and page or tagline text
+_TITLE_SEPARATOR = re.compile(r"\s+[|\-\u2013\u2014\u00b7\u00bb]+\s+|\s*:\s+")
+_GENERIC_TITLE_PARTS = {
+  "home", "home page", "homepage", "welcome", "official site", "official website", "contact", "contact us",
+  "about", "about us",
+}
+
+find_businesses_task = """Find the URLs and phone numbers of any 10 small businesses that provide the service mentioned below, and in the county mentioned below.
+
+Use Google Search adding 'phone number' to the query, and get the URL and phone number just from the results pages. Click on next pages of results to find more businesses if some on the first page are missing phone numbers. Do not click any links. Avoid businesses where Yelp or other aggregator is the URL.
+
+Service: {item_type}
+County: {county}
+"""
+
+
+class SearchBackend(Protocol):
+  async def fetch(self, query: str, page: int) -> str:
+    """Return the HTML of one page of search results."""
+    ...
+
+
+class HttpSearchBackend:
+  """Fetches result pages from any search engine with a plain HTML results page."""
+  def __init__(self, url_template: str = SEARCH_URL_TEMPLATE):
+    self.url_template = url_template
+
+  async def fetch(self, query: str, page: int) -> str:
+    url = self.url_template.format(query=quote_plus(query), page=page, offset=page * RESULTS_PER_PAGE)
+
+    async def request():
+      async with httpx.AsyncClient(follow_redirects=True, headers={"User-Agent": "Mozilla/5.0"}) as client:
+        response = await client.get(url)
+        if response.status_code != 200:
+          raise UpstreamError.from_response(response, "Failed to fetch search results")
+        return response.text
+
+    return await search_provider.call(request)
+
+
+class SearchResult:
+  def __init__(self, url: str, name: str):
+    self.url = url
+    self.name = name
+    self.text: List[str] = []
+
+  @property
+  def phones(self) -> List[int]:
+    found = []
+    for match in _PHONE.finditer(" ".join(self.text)):
+      phone = int("".join(match.groups()))
+      if phone not in found:
+        found.append(phone)
+    return found
+
+  def snippet(self) -> str:
+    return f"{self.name} | {self.url} | {' '.join(self.text)[:300]}"
+
+
+def unwrap_result_url(href: str) -> str:
+  """Follow search engines' redirect links (e.g. /l/?uddg=..., /url?q=...) to the real target."""
+  parts = urlsplit(href)
+  params = parse_qs(parts.query)
+  for key in ("uddg", "q", "url"):
+    if key in params and params[key][0].startswith("http"):
+      return params[key][0]
+  return href
+
+
+class ResultPageParser(HTMLParser):
+  """
+  Splits a results page into one entry per external link, with the text up to
+  the next external link attached to it. Consecutive links to the same site
+  (title, display URL, snippet) are folded into one entry, and text following
+  links to aggregators or the search engine itself is dropped.
+  """
+  def __init__(self):
+    super().__init__()
+    self.results: List[SearchResult] = []
+    self._current: Optional[SearchResult] = None
+    self._href: Optional[str] = None
+    self._anchor_text: List[str] = []
+    self._skip_depth = 0
+
+  def handle_starttag(self, tag, attrs):
+    if tag in ("script", "style"):
+      self._skip_depth += 1
+    elif tag == "a":
+      self._href = dict(attrs).get("href") or ""
+      self._anchor_text = []
+
+  def handle_endtag(self, tag):
+    if tag in ("script", "style"):
+      self._skip_depth = max(0, self._skip_depth - 1)
+    elif tag == "a" and self._href is not None:
+      self._end_anchor(self._href, " ".join(text for text in self._anchor_text if text))
+      self._href = None
+
+  def handle_data(self, data):
+    if self._skip_depth or not data.strip():
+      return
+    if self._href is not None:
+      self._anchor_text.append(data.strip())
+    elif self._current:
+      self._current.text.append(data.strip())
+
+  def _end_anchor(self, href: str, text: str):
+    url = unwrap_result_url(href)
+    host = normalize_host(url) if url.startswith("http") else None
+    if not host:
+      # Navigation and other links within the results page
+      return
+    site = host.split("/")[0]
+    if is_aggregator_host(site):
+      self._current = None
+      return
+    if self._current and normalize_host(self._current.url) == host:
+      if text:
+        self._current.text.append(text)
+      return
+    self._current = SearchResult(url, text)
+    self.results.append(self._current)
+
+
+def parse_results_page(html: str) -> List[SearchResult]:
+  parser = ResultPageParser()
+  parser.feed(html)
+  parser.close()
+  return parser.results
+
+
+def clean_business_name(title: str) -> Optional[str]:
+  """
+  Reduce a result title like "Bay Plumbing Co. | Licensed Plumbers in San Mateo"
+  or "Home - Foster City Plumbing" to the business name: the first part that
+  isn't generic page text. Returns None when no part looks like a name.
+  """
+  for part in _TITLE_SEPARATOR.split(title or ""):
+    part = part.strip()
+    if part and part.lower() not in _GENERIC_TITLE_PARTS:
+      return None if _URL_LIKE.search(part) else part
+  return None
+
+
+def split_results(results: List[SearchResult]) -> Tuple[List[Business], List[SearchResult]]:
+  """Turn unambiguous results (a name and exactly one phone) into businesses; return the rest for the LLM."""
+  businesses, ambiguous = [], []
+  for result in results:
+    phones = result.phones
+    name = clean_business_name(result.name)
+    if len(phones) == 1 and name:
+      businesses.append(Business(
+        name=name, url=result.url, phone_number=phones[0], notes=None, quote=None, conversation_id=None
+      ))
+    else:
+      ambiguous.append(result)
+  return businesses, ambiguous
+
+
+async def resolve_ambiguous(results: List[SearchResult]) -> Tuple[List[Business], int]:
+  """
+  Ask the LLM about results the parser couldn't settle. Listings are kept only
+  when they point at one of those results' sites and not at an aggregator, so
+  an invented or directory URL never becomes a business. Returns businesses and
+  an estimate of tokens used.
+  """
+  if not results:
+    return [], 0
+  hosts = {normalize_host(result.url) for result in results}
+  snippets = "\n".join(f"{i + 1}. {result.snippet()}" for i, result in enumerate(results))
+  listings = await openai_chat_provider.run_sync(baml.ExtractBusinessListings, snippets)
+  businesses = []
+  for listing in listings:
+    host = normalize_host(listing.url)
+    if not host or host not in hosts or is_aggregator_host(host.split("/")[0]):
+      print(f"[Discovery] Dropping listing {listing.name!r} at {listing.url!r}, which isn't one of the results")
+      continue
+    phones = [int("".join(match.groups())) for match in _PHONE.finditer(listing.phone_number or "")]
+    if phones:
+      businesses.append(Business(
+        name=listing.name, url=listing.url, phone_number=phones[0], notes=None, quote=None, conversation_id=None
+      ))
+  # Roughly four characters per token, for both the prompt and the answer
+  tokens = (len(snippets) + 600 + sum(len(listing.model_dump_json()) for listing in listings)) // 4
+  return businesses, tokens
+
+
+async def discover_businesses(
+  item_type: str,
+  county: str,
+  backend: Optional[SearchBackend] = None,
+  pages: int = SEARCH_PAGES,
+  use_llm: bool = True,
+) -> Tuple[FindBusinessesResult, int]:
+  """
+  Find businesses without a browser: fetch result pages concurrently, parse
+  them directly and only send ambiguous entries to the LLM. Returns the result
+  and an estimate of the LLM tokens spent.
+  """
+  backend = backend or HttpSearchBackend()
+  query = f"{item_type} {county} phone number"
+  pages_html = await asyncio.gather(*(backend.fetch(query, page) for page in range(pages)), return_exceptions=True)
+
+  results = []
+  for html in pages_html:
+    if isinstance(html, Exception):
+      print(f"[Discovery] Failed to fetch results page: {html}")
+      continue
+    results.extend(parse_results_page(html))
+
+  businesses, ambiguous = split_results(results)
+  tokens = 0
+  if use_llm and len(businesses) < MAX_BUSINESSES:
+    resolved, tokens = await resolve_ambiguous(ambiguous)
+    businesses.extend(resolved)
+
+  unique, seen_hosts, seen_phones = [], set(), set()
+  for business in businesses:
+    host = normalize_host(business.url)
+    if host in seen_hosts or business.phone_number in seen_phones:
+      continue
+    seen_hosts.add(host)
+    seen_phones.add(business.phone_number)
+    unique.append(business)
+  return FindBusinessesResult(businesses=unique[:MAX_BUSINESSES]), tokens
+
+
+async def find_businesses_with_agent(item_type: str, county: str) -> Tuple[Optional[str], int]:
+  """Run the browser agent over Google results. Returns its raw JSON result and the tokens it used."""
+  from browser_use import Agent, Controller
+  from langchain_openai import ChatOpenAI
+
+  controller = Controller(output_model=FindBusinessesResult)
+  agent = Agent(
+    task=find_businesses_task.format(item_type=item_type, county=county),
+    llm=ChatOpenAI(model="gpt-4o"),
+    controller=controller,
+  )
+  history = await openai_provider.call(agent.run)
+  return history.final_result(), history.total_input_tokens()
@@ -0,0 +1,184 @@
+import asyncio
+import base64
+import os
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Optional
+
+from .recording import EVENT_RELAY, MEDIA_OUTBOUND, CallRecorder
+
+# Twilio media streams carry 8 kHz, 8-bit mu-law: one byte per sample
+MULAW_BYTES_PER_SECOND = 8000
+# Seconds of audio we let Twilio buffer ahead of playback. Anything beyond this
+# waits here, where an interruption can drop it instantly.
+DOWNLINK_LEAD = float(os.getenv("DOWNLINK_LEAD", "0.2"))
+# Small chunks are merged into media messages of up to this many bytes (0 disables merging)
+DOWNLINK_MERGE_BYTES = int(os.getenv("DOWNLINK_MERGE_BYTES", "1600"))
+# Audio held back before the ElevenLabs reader has to wait (60 s)
+DOWNLINK_MAX_BYTES = int(os.getenv("DOWNLINK_MAX_BYTES", str(60 * MULAW_BYTES_PER_SECOND)))
+
+
+class DownlinkStats:
+  """Process-wide barge-in measurements: interruption received to clear sent."""
+  def __init__(self):
+    self.interruptions = 0
+    self.total_latency = 0.0
+    self.max_latency = 0.0
+    self.dropped_bytes = 0
+
+  def record(self, latency: float, dropped_bytes: int):
+    self.interruptions += 1
+    self.total_latency += latency
+    self.max_latency = max(self.max_latency, latency)
+    self.dropped_bytes += dropped_bytes
+
+  def snapshot(self) -> dict:
+    return {
+      "interruptions": self.interruptions,
+      "mean_barge_in_latency": self.total_latency / self.interruptions if self.interruptions else None,
+      "max_barge_in_latency": self.max_latency,
+      "dropped_audio_seconds": self.dropped_bytes / MULAW_BYTES_PER_SECOND,
+    }
+
+
+downlink_stats = DownlinkStats()
+
+
+class DownlinkQueue:
+  """
+  Audio and control messages on their way to Twilio, written by one task.
+  Audio is paced to real time plus a small lead, so most unplayed speech stays
+  in this queue; flush() drops all of it in O(1) and sends clear ahead of
+  anything still waiting. Control messages always go before queued audio.
+  drain() lets the last of the audio play out when a call ends normally.
+  With a recorder attached, messages are recorded as they are written, so
+  dropped audio never reaches the recording.
+  """
+  def __init__(
+    self,
+    send: Callable[[dict], Awaitable[None]],
+    lead: float = DOWNLINK_LEAD,
+    merge_bytes: int = DOWNLINK_MERGE_BYTES,
+    max_bytes: int = DOWNLINK_MAX_BYTES,
+  ):
+    self.send = send
+    self.stream_sid: Optional[str] = None
+    self.recorder: Optional[CallRecorder] = None
+    self.lead = lead
+    self.merge_bytes = merge_bytes
+    self.max_bytes = max_bytes
+    self._audio: Deque[bytes] = deque()
+    self._audio_bytes = 0
+    self._control: Deque[dict] = deque()
+    self._play_until = 0.0
+    self._interrupted_at: Optional[float] = None
+    self._dropped_bytes = 0
+    self._wake = asyncio.Event()
+    self._space = asyncio.Event()
+    self._space.set()
+    # Set while nothing is waiting to be written
+    self._idle = asyncio.Event()
+    self._idle.set()
+
+  @property
+  def pending_seconds(self) -> float:
+    return self._audio_bytes / MULAW_BYTES_PER_SECOND
+
+  async def push_audio(self, payload: str):
+    """Queue a base64 mu-law chunk, waiting while the queue is full."""
+    while self._audio_bytes >= self.max_bytes:
+      self._space.clear()
+      await self._space.wait()
+    chunk = base64.b64decode(payload)
+    self._audio.append(chunk)
+    self._audio_bytes += len(chunk)
+    self._idle.clear()
+    self._wake.set()
+
+  def push_control(self, message: dict):
+    self._control.append(message)
+    self._idle.clear()
+    self._wake.set()
+
+  def flush(self):
+    """Drop all queued audio and send clear next, for when the business talks over the agent."""
+    self._interrupted_at = time.monotonic()
+    self._dropped_bytes = self._audio_bytes
+    self._audio = deque()
+    self._audio_bytes = 0
+    self._play_until = 0.0
+    self._space.set()
+    self.push_control({"event": "clear", "streamSid": self.stream_sid})
+
+  def _take_audio(self) -> bytes:
+    chunk = self._audio.popleft()
+    if self.merge_bytes and len(chunk) < self.merge_bytes and self._audio:
+      parts = [chunk]
+      size = len(chunk)
+      while self._audio and size + len(self._audio[0]) <= self.merge_bytes:
+        parts.append(self._audio.popleft())
+        size += len(parts[-1])
+      chunk = b"".join(parts)
+    self._audio_bytes -= len(chunk)
+    self._space.set()
+    return chunk
+
+  async def run(self):
+    while True:
+      if self._control:
+        message = self._control.popleft()
+        await self.send(message)
+        if self.recorder:
+          self.recorder.event(EVENT_RELAY, message)
+        if message.get("event") == "clear" and self._interrupted_at is not None:
+          downlink_stats.record(time.monotonic() - self._interrupted_at, self._dropped_bytes)
+          self._interrupted_at = None
+        continue
+
+      if not self._audio:
+        self._idle.set()
+        self._wake.clear()
+        await self._wake.wait()
+        continue
+
+      now = time.monotonic()
+      ahead = self._play_until - now
+      if ahead > self.lead:
+        # Wait until Twilio is close to running out, but wake early for control messages
+        self._wake.clear()
+        try:
+          await asyncio.wait_for(self._wake.wait(), ahead - self.lead)
+        except asyncio.TimeoutError:
+          pass
+        continue
+
+      chunk = self._take_audio()
+      payload = base64.b64encode(chunk).decode()
+      await self.send({"event": "media", "streamSid": self.stream_sid, "media": {"payload": payload}})
+      if self.recorder:
+        self.recorder.media(MEDIA_OUTBOUND, payload)
+      self._play_until = max(self._play_until, now) + len(chunk) / MULAW_BYTES_PER_SECOND
+
+  async def drain(self, timeout: float) -> bool:
+    """
+    Wait, up to timeout, until everything queued has been written and Twilio
+    has played it, so the agent's last words aren't cut off. Needs run() going.
+    Returns whether playback finished in time.
+    """
+    deadline = time.monotonic() + timeout
+    try:
+      await asyncio.wait_for(self._idle.wait(), timeout)
+    except asyncio.TimeoutError:
+      return False
+    remaining = self._play_until - time.monotonic()
+    if remaining > deadline - time.monotonic():
+      return False
+    if remaining > 0:
+      await asyncio.sleep(remaining)
+    return True
+
+  def discard(self):
+    self._audio = deque()
+    self._audio_bytes = 0
+    self._control.clear()
+    self._space.set()
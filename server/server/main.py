@@ -2,26 +2,33 @@ import os
 import json
 import base64
 from dotenv import load_dotenv
-from fastapi import FastAPI, WebSocket, HTTPException, Request
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, Response
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from twilio.rest import Client
+from twilio.request_validator import RequestValidator
 import httpx
 import websockets
 from urllib.parse import quote
-from browser_use import Agent, Controller
-from langchain_openai import ChatOpenAI
 from langchain_anthropic import ChatAnthropic
 import uvicorn
-from typing import List
+from typing import List, Optional
 import asyncio
 import zipcodes
-from baml_client import b as baml
 from baml_client.types import Quote
+from .call_lifecycle import CallRecord, CallRequest, call_tracker, parse_status_callback, MAX_CALL_ATTEMPTS, CALL_RETRY_DELAY, CALL_STATUS_GRACE, RETRY_STATES, STATUS_CALLBACK_EVENTS
+from .call_session import CallSession, SessionEnded, call_stats
+from .downlink import downlink_stats
+from .recording import open_recorder, MEDIA_INBOUND, EVENT_TWILIO, EVENT_ELEVENLABS, EVENT_RELAY
 from .database import Database
-from .models import FindBusinessesResult, Business
-
-app = FastAPI()
+from .discovery import discover_businesses, find_businesses_with_agent
+from .transcripts import TranscriptStore, FINAL_STATUSES
+from .quotes import extract_quote, quote_extraction_stats
+from .models import Business
+from .resilience import UpstreamError, providers, elevenlabs_provider, twilio_provider
+from .serialization import parse_find_businesses_result, dump_find_businesses_result
+
+app = FastAPI(default_response_class=ORJSONResponse)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000"],
@@ -31,6 +38,7 @@ app.add_middleware(
 )
 
 database = Database()
+transcript_store = TranscriptStore()
 
 # Load environment variables
 load_dotenv()
@@ -41,6 +49,8 @@ ELEVENLABS_AGENT_ID = os.getenv('ELEVENLABS_AGENT_ID')
 TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID')
 TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN')
 TWILIO_PHONE_NUMBER = os.getenv('TWILIO_PHONE_NUMBER')
+# "agent" drives a browser with GPT-4o, "fast" parses search result pages directly
+DISCOVERY_MODE = os.getenv('DISCOVERY_MODE', 'agent')
 
 required_vars = [
   ELEVENLABS_API_KEY,
@@ -55,15 +65,8 @@ if not all(required_vars):
 
 # Initialize Twilio client
 twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+twilio_validator = RequestValidator(TWILIO_AUTH_TOKEN)
   
-find_businesses_task = """Find the URLs and phone numbers of any 10 small businesses that provide the service mentioned below, and in the county mentioned below. 
-
-Use Google Search adding 'phone number' to the query, and get the URL and phone number just from the results pages. Click on next pages of results to find more businesses if some on the first page are missing phone numbers. Do not click any links. Avoid businesses where Yelp or other aggregator is the URL.
-
-Service: {item_type}
-County: {county}
-"""
-
 phone_agent_prompt = """You are someone calling local businesses to get quotes on services. Keep your tone casual and conversational, and add a few pauses, ums and ahs to make it sound natural.
 
 Start by giving the basic context on what you're looking for by saying something like 'Hi, I'm looking for ...', don't provide any personal information or the service details unless asked.
@@ -92,41 +95,72 @@ async def find_businesses(request: Request):
   item_type = data.get("item_type")
   location = data.get("location")
   county = zipcodes.matching(location)[0]["county"]
+  mode = data.get("mode", DISCOVERY_MODE)
   try:
-    controller = Controller(output_model=FindBusinessesResult)
-    agent = Agent(
-      task=find_businesses_task.format(item_type=item_type, county=county),
-      llm=ChatOpenAI(model="gpt-4o"),
-      controller=controller,
-    )
-    history = await agent.run()
-    result = history.final_result()
-    if result:
-      parsed: FindBusinessesResult = FindBusinessesResult.model_validate_json(result)
+    if mode == "fast":
+      parsed, tokens = await discover_businesses(item_type, county)
+    else:
+      result, tokens = await find_businesses_with_agent(item_type, county)
+      parsed = parse_find_businesses_result(result) if result else None
+    print(f"[Discovery] {mode} search used ~{tokens} tokens")
+    if parsed and parsed.businesses:
+      if database.business_index.stale:
+        database.rebuild_business_index()
+      parsed.businesses, duplicates = database.business_index.merge(parsed.businesses)
+      for business in parsed.businesses:
+        business.service = item_type
+        business.county = county
       database.upsert_businesses(parsed.businesses)
-      return {"result": parsed}
+      return ORJSONResponse({"result": dump_find_businesses_result(parsed), "duplicates": duplicates})
     else:
       return {"error": "No result found"}
   except Exception as e:
     return {"error": str(e)}
   
+async def elevenlabs_get(path: str, error_detail: str) -> dict:
+  """GET an ElevenLabs REST endpoint, with retries and limits shared across all ElevenLabs calls"""
+  async def request():
+    async with httpx.AsyncClient() as client:
+      response = await client.get(
+        f"https://api.elevenlabs.io{path}",
+        headers={"xi-api-key": ELEVENLABS_API_KEY}
+      )
+
+      if response.status_code != 200:
+        raise UpstreamError.from_response(response, error_detail)
+
+      return response.json()
+
+  return await elevenlabs_provider.call(request)
+
 async def get_signed_url():
   """Helper function to get signed URL for authenticated conversations"""
-  async with httpx.AsyncClient() as client:
-    response = await client.get(
-      f"https://api.elevenlabs.io/v1/convai/conversation/get_signed_url?agent_id={ELEVENLABS_AGENT_ID}",
-      headers={"xi-api-key": ELEVENLABS_API_KEY}
-    )
-    
-    if response.status_code != 200:
-      raise HTTPException(status_code=response.status_code, detail="Failed to get signed URL")
-    
-    data = response.json()
-    return data["signed_url"]
+  data = await elevenlabs_get(
+    f"/v1/convai/conversation/get_signed_url?agent_id={ELEVENLABS_AGENT_ID}",
+    "Failed to get signed URL"
+  )
+  return data["signed_url"]
+
+async def get_transcript(conversation_id: str) -> List[dict]:
+  """Read a transcript from the local store, fetching it from ElevenLabs until it is final"""
+  transcript = transcript_store.get(conversation_id)
+  if transcript is not None:
+    return transcript
+
+  conversation = await elevenlabs_get(f"/v1/convai/conversations/{conversation_id}", "Failed to get conversation")
+  transcript = conversation.get("transcript") or []
+  if conversation.get("status") in FINAL_STATUSES:
+    transcript_store.put(conversation_id, transcript)
+  return transcript
 
 @app.post("/outbound-call")
 async def outbound_call(request: Request):
-  """Route to initiate outbound calls"""
+  """
+  Route to initiate outbound calls. Businesses we've already had a conversation
+  with are refused with 409 unless the request sets "force": true; busy,
+  unanswered and failed calls can always be redialed. A number with a call
+  still in progress is always refused with 409.
+  """
   data = await request.json()
   business_number = data.get("business_number")
   business_url = data.get("business_url")
@@ -140,21 +174,53 @@ async def outbound_call(request: Request):
   if not business_number:
     raise HTTPException(status_code=400, detail="Business number is required")
 
-  try:
-    call = twilio_client.calls.create(
-      from_=TWILIO_PHONE_NUMBER,
-      to=business_number,
-      url=f"https://{request.headers['host']}/outbound-call-twiml?business_name={quote(business_name)}&service_description={quote(service_description)}&user_name={quote(user_name)}&user_phone_number={quote(user_phone_number)}&user_location={quote(user_location)}&business_url={quote(business_url)}&service_detail={quote(service_detail)}",
-      method="GET"
+  if database.business_index.stale:
+    database.rebuild_business_index()
+  if database.business_index.was_called(business_number) and not data.get("force"):
+    database.business_index.duplicate_calls_avoided += 1
+    return ORJSONResponse(
+      status_code=409,
+      content={
+        "success": False,
+        "error": "Business has already been called"
+      }
+    )
+  # Never two calls to the same number at once, even with force
+  if call_tracker.call_in_progress(business_number):
+    database.business_index.duplicate_calls_avoided += 1
+    return ORJSONResponse(
+      status_code=409,
+      content={
+        "success": False,
+        "error": "Business is already being called"
+      }
+    )
+
+  if not call_tracker.reserve(business_number):
+    return ORJSONResponse(
+      status_code=429,
+      content={
+        "success": False,
+        "error": "Too many calls in progress"
+      }
     )
 
+  call_request = CallRequest(
+    business_url=business_url,
+    business_number=business_number,
+    twiml_url=f"https://{request.headers['host']}/outbound-call-twiml?business_name={quote(business_name)}&service_description={quote(service_description)}&user_name={quote(user_name)}&user_phone_number={quote(user_phone_number)}&user_location={quote(user_location)}&business_url={quote(business_url)}&service_detail={quote(service_detail)}",
+    status_callback_url=f"https://{request.headers['host']}/call-status",
+  )
+
+  try:
+    record = await place_call(call_request)
     return {
       "success": True,
       "message": "Call initiated",
-      "callSid": call.sid
+      "callSid": record.call_sid
     }
   except Exception as e:
-    return JSONResponse(
+    return ORJSONResponse(
       status_code=500,
       content={
         "success": False,
@@ -162,6 +228,65 @@ async def outbound_call(request: Request):
       }
     )
 
+async def place_call(call_request: CallRequest, attempt: int = 1) -> CallRecord:
+  """Start a Twilio call that reports its progress to /call-status, in a slot taken with call_tracker.reserve()"""
+  try:
+    call = await twilio_provider.run_sync(
+      twilio_client.calls.create,
+      idempotent=False,
+      from_=TWILIO_PHONE_NUMBER,
+      to=call_request.business_number,
+      url=call_request.twiml_url,
+      method="GET",
+      status_callback=call_request.status_callback_url,
+      status_callback_event=STATUS_CALLBACK_EVENTS,
+      status_callback_method="POST"
+    )
+  except BaseException:
+    call_tracker.release(call_request.business_number)
+    raise
+  return call_tracker.register(call.sid, call_request, attempt)
+
+@app.post("/call-status")
+async def call_status(request: Request):
+  """Twilio status callback, driving each call's state machine"""
+  params = parse_status_callback(await request.body())
+  url = f"https://{request.headers['host']}{request.url.path}"
+  if not twilio_validator.validate(url, params, request.headers.get("X-Twilio-Signature", "")):
+    raise HTTPException(status_code=403, detail="Invalid Twilio signature")
+
+  call_sid = params.get("CallSid")
+  status = params.get("CallStatus")
+  print(f"[Twilio] Call {call_sid} status: {status}")
+  call_tracker.update(call_sid, status)
+  return Response(status_code=204)
+
+async def handle_call_ended(record: CallRecord):
+  """
+  Record the outcome on the business, then extract the quote or schedule a
+  retry. Runs for every call that reaches a terminal state.
+  """
+  try:
+    business = database.get_business(business_url=record.request.business_url)
+    if business:
+      business.call_status = record.state
+      database.upsert_businesses([business])
+
+    if record.state == "completed" and business and business.conversation_id:
+      # Give ElevenLabs a moment to finalize the transcript, as the media stream path does
+      await asyncio.sleep(5)
+      await process_business_quote(business)
+    elif record.state in RETRY_STATES and record.attempt < MAX_CALL_ATTEMPTS:
+      print(f"[CallLifecycle] Call {record.call_sid} ended {record.state}, retrying in {CALL_RETRY_DELAY:.0f}s")
+      await asyncio.sleep(CALL_RETRY_DELAY)
+      while not call_tracker.reserve(record.request.business_number):
+        await asyncio.sleep(5)
+      await place_call(record.request, record.attempt + 1)
+  except Exception as e:
+    print(f"[CallLifecycle] Error handling end of call {record.call_sid}: {e}")
+
+call_tracker.on_call_ended = handle_call_ended
+
 @app.get("/outbound-call-twiml")
 async def outbound_call_twiml(request: Request):
   """TwiML route for outbound calls"""
@@ -194,15 +319,16 @@ async def outbound_media_stream(websocket: WebSocket):
   print("[Server] Twilio connected to outbound media stream")
 
   # Variables to track the call
+  session = CallSession(websocket)
   stream_sid = None
   call_sid = None
-  elevenlabs_ws = None
   custom_parameters = None
   conversation_id = None
 
   async def handle_elevenlabs_messages(elevenlabs_ws):
     # Handle messages from ElevenLabs
     async for message in elevenlabs_ws:
+      session.touch()
       try:
         msg = json.loads(message)
         msg_type = msg.get("type")
@@ -213,7 +339,8 @@ async def outbound_media_stream(websocket: WebSocket):
           conversation_id = msg.get("conversation_initiation_metadata_event", {}).get("conversation_id")
           print(f"[ElevenLabs] Received conversation ID: {conversation_id}")
           business_url = custom_parameters.get("business_url", "")
-          business = database.get_business(business_url=business_url)
+          # Replays and other streams without a business have nothing to update
+          business = database.get_business(business_url=business_url) if business_url else None
           if business:
             business.conversation_id = conversation_id
             database.upsert_businesses([business])
@@ -222,127 +349,140 @@ async def outbound_media_stream(websocket: WebSocket):
           if stream_sid:
             audio_chunk = msg.get("audio", {}).get("chunk") or msg.get("audio_event", {}).get("audio_base_64")
             if audio_chunk:
-              print("[ElevenLabs] Sending audio chunk to Twilio")
-              await websocket.send_json({
-                "event": "media",
-                "streamSid": stream_sid,
-                "media": {"payload": audio_chunk}
-              })
+              print("[ElevenLabs] Queueing audio chunk for Twilio")
+              await session.send_audio(audio_chunk)
 
         elif msg_type == "interruption":
+          if session.recorder:
+            session.recorder.event(EVENT_ELEVENLABS, msg)
           if stream_sid:
             print("[ElevenLabs] Sending clear event to Twilio")
-            await websocket.send_json({
-              "event": "clear",
-              "streamSid": stream_sid
-            })
+            # Unplayed audio is dropped here rather than sent and then cleared
+            session.interrupt()
 
         elif msg_type == "ping":
+          if session.recorder:
+            session.recorder.event(EVENT_ELEVENLABS, msg)
           event_id = msg.get("ping_event", {}).get("event_id")
           if event_id:
             print("[ElevenLabs] Responding to ping")
-            await elevenlabs_ws.send(json.dumps({
+            pong = {
               "type": "pong",
               "event_id": event_id
-            }))
+            }
+            if session.recorder:
+              session.recorder.event(EVENT_RELAY, pong)
+            await session.send_to_elevenlabs(pong)
 
       except Exception as e:
         print(f"[ElevenLabs] Error processing message: {e}")
 
   async def setup_elevenlabs():
-    nonlocal elevenlabs_ws
-    try:
-      signed_url = await get_signed_url()
-      elevenlabs_ws = await websockets.connect(signed_url)
-      print("[ElevenLabs] Connected to websocket")
-
-      # Send initial configuration
-      initial_config = {
-        "type": "conversation_initiation_client_data",
-        "conversation_config_override": {
-          "agent": {
-            "prompt": {
-              "prompt": custom_parameters.get("prompt", "you are a gary from the phone store"),
-              "tools": [
-                {
-                  "type": "system",
-                  "name": "end_call",
-                  "description": "Politely say goodbye and end the call as soon as you get a quote."
-                }
-              ]
-            },
-          }
+    signed_url = await get_signed_url()
+    elevenlabs_ws = await elevenlabs_provider.call(lambda: websockets.connect(signed_url))
+    print("[ElevenLabs] Connected to websocket")
+    session.attach_elevenlabs(elevenlabs_ws, lambda: handle_elevenlabs_messages(elevenlabs_ws))
+
+    # Send initial configuration
+    initial_config = {
+      "type": "conversation_initiation_client_data",
+      "conversation_config_override": {
+        "agent": {
+          "prompt": {
+            "prompt": custom_parameters.get("prompt", "you are a gary from the phone store"),
+            "tools": [
+              {
+                "type": "system",
+                "name": "end_call",
+                "description": "Politely say goodbye and end the call as soon as you get a quote."
+              }
+            ]
+          },
         }
       }
-      await elevenlabs_ws.send(json.dumps(initial_config))
-      print("[ElevenLabs] Sent initial config")
+    }
+    await session.send_to_elevenlabs(initial_config)
+    print("[ElevenLabs] Queued initial config")
 
-    except Exception as e:
-      print(f"[ElevenLabs] Setup error: {e}")
+  async def handle_twilio_messages():
+    # Handle messages from Twilio
+    nonlocal stream_sid, call_sid, custom_parameters
+    try:
+      async for message in websocket.iter_json():
+        session.touch()
+        event = message.get("event")
+
+        if event == "start":
+          stream_sid = message["start"]["streamSid"]
+          call_sid = message["start"]["callSid"]
+          custom_parameters = message["start"]["customParameters"]
+          print(f"[Twilio] Stream started - StreamSid: {stream_sid}, CallSid: {call_sid}")
+          session.downlink.stream_sid = stream_sid
+          session.recorder = open_recorder(call_sid)
+          # Outbound audio and clear are recorded when written to Twilio, after pacing and flushes
+          session.downlink.recorder = session.recorder
+          if session.recorder:
+            session.recorder.event(EVENT_TWILIO, message)
+          await setup_elevenlabs()
+
+        elif event == "media" and session.elevenlabs_ws:
+          if session.recorder:
+            session.recorder.media(MEDIA_INBOUND, message["media"]["payload"])
+          await session.send_to_elevenlabs({
+            "type": "user_audio_chunk",  # Add type field
+            "user_audio_chunk": message["media"]["payload"]
+          })
+
+        elif event == "stop":
+          print(f"[Twilio] Stream {stream_sid} ended")
+          if session.recorder:
+            session.recorder.event(EVENT_TWILIO, message)
+          raise SessionEnded("twilio_stop")
+    except WebSocketDisconnect:
+      print(f"[Twilio] Stream {stream_sid} disconnected")
 
-  # Handle messages from Twilio
   try:
-    async for message in websocket.iter_json():
-      event = message.get("event")
-      
-      if event == "start":
-        stream_sid = message["start"]["streamSid"]
-        call_sid = message["start"]["callSid"]
-        custom_parameters = message["start"]["customParameters"]
-        print(f"[Twilio] Stream started - StreamSid: {stream_sid}, CallSid: {call_sid}")
-        await setup_elevenlabs()
-        asyncio.create_task(handle_elevenlabs_messages(elevenlabs_ws))
-
-      elif event == "media" and elevenlabs_ws:
-        audio_message = {
-          "type": "user_audio_chunk",  # Add type field
-          "user_audio_chunk": message["media"]["payload"]
-        }
-        await elevenlabs_ws.send(json.dumps(audio_message))
-
-      elif event == "stop":
-        print(f"[Twilio] Stream {stream_sid} ended")
-        if elevenlabs_ws:
-          await elevenlabs_ws.close()
-        break
-
-  except Exception as e:
-    print(f"[Twilio] Error: {e}")
+    await session.run(handle_twilio_messages)
   finally:
-    if elevenlabs_ws:
-      await elevenlabs_ws.close()
-    await websocket.close()
-    # Get transcript and extract quote
-    try:
-      await asyncio.sleep(5)
-      business = database.get_business(conversation_id=conversation_id)
-      if not business:
-        raise HTTPException(status_code=404, detail="Business not found")
-
-      async def get_conversation(conversation_id):
-        async with httpx.AsyncClient() as client:
-          response = await client.get(
-            f"https://api.elevenlabs.io/v1/convai/conversations/{conversation_id}",
-            headers={"xi-api-key": ELEVENLABS_API_KEY}
-          )
-
-          if response.status_code != 200:
-            raise HTTPException(status_code=response.status_code, detail="Failed to get conversation")
-
-          return response.json()
-
-      conversation = await get_conversation(conversation_id)
-      transcript = conversation.get("transcript", "No transcript available")
-      transcript_text = ""
-      for message in transcript:
-        transcript_text += f"{message['role']}: {message['message']}\n\n"
-      quote = baml.ExtractQuote(transcript_text)
-      business.quote = quote.quote_amount
-      business.notes = quote.notes
-      database.upsert_businesses([business])
-    except Exception as e:
-      print(f"[ProcessConversation] Error: {e}")
-    
+    # Calls placed through /outbound-call extract the quote once Twilio reports them
+    # completed, or once the grace period after the stream runs out without that
+    # report; anything else is processed here
+    if call_sid in call_tracker.calls:
+      if not call_tracker.calls[call_sid].terminal:
+        call_tracker.spawn(end_call_after_stream(call_sid))
+    else:
+      try:
+        await asyncio.sleep(5)
+        business = database.get_business(conversation_id=conversation_id)
+        if not business:
+          raise HTTPException(status_code=404, detail="Business not found")
+        await process_business_quote(business)
+      except Exception as e:
+        print(f"[ProcessConversation] Error: {e}")
+
+async def end_call_after_stream(call_sid: str):
+  """
+  End a tracked call whose media stream closed but whose final status never
+  arrived (e.g. callbacks failing signature validation behind a proxy), so its
+  slot is freed and the quote still gets extracted.
+  """
+  await asyncio.sleep(CALL_STATUS_GRACE)
+  record = call_tracker.calls.get(call_sid)
+  if record and not record.terminal:
+    print(f"[CallLifecycle] No final status for {call_sid} after its stream closed, treating it as completed")
+    call_tracker.update(call_sid, "completed")
+
+async def process_business_quote(business: Business) -> List[dict]:
+  """Extract the quote from a business's conversation and save it"""
+  transcript = await get_transcript(business.conversation_id)
+  quote = await extract_quote(transcript)
+  business.quote = quote.quote_amount
+  business.notes = quote.notes
+  business.discount_accepted = quote.discount_accepted
+  database.upsert_businesses([business])
+  database.business_index.mark_called(business.phone_number)
+  return transcript
+
 
 @app.post("/process-conversation")
 async def process_conversation(request: Request):
@@ -352,29 +492,69 @@ async def process_conversation(request: Request):
   if not business:
     raise HTTPException(status_code=404, detail="Business not found")
 
-  async def get_conversation(conversation_id):
-    async with httpx.AsyncClient() as client:
-      response = await client.get(
-        f"https://api.elevenlabs.io/v1/convai/conversations/{conversation_id}",
-        headers={"xi-api-key": ELEVENLABS_API_KEY}
-      )
-
-      if response.status_code != 200:
-        raise HTTPException(status_code=response.status_code, detail="Failed to get conversation")
-
-      return response.json()
-
-  conversation = await get_conversation(conversation_id)
-  transcript = conversation.get("transcript", "No transcript available")
-  transcript_text = ""
-  for message in transcript:
-    transcript_text += f"{message['role']}: {message['message']}\n\n"
-  quote = baml.ExtractQuote(transcript_text)
-  business.quote = quote.quote_amount
-  business.notes = quote.notes
-  database.upsert_businesses([business])
+  transcript = await process_business_quote(business)
   return {"transcript": transcript}
 
+@app.get("/price-aggregates")
+async def get_price_aggregates(service: Optional[str] = None, county: Optional[str] = None):
+  """Quote statistics per service and county, or for a single pair if both are given."""
+  if not database.quote_aggregates.built:
+    database.rebuild_quote_aggregates()
+  if service is None or county is None:
+    return {"aggregates": database.quote_aggregates.all()}
+  aggregate = database.quote_aggregates.get(service, county)
+  if aggregate is None:
+    raise HTTPException(status_code=404, detail="No quotes for this service and county")
+  return aggregate
+
+@app.post("/price-aggregates/rebuild")
+async def rebuild_price_aggregates():
+  """Recompute quote statistics from the full businesses table."""
+  database.rebuild_quote_aggregates()
+  return {"aggregates": len(database.quote_aggregates.aggregates)}
+
+@app.get("/business-index")
+async def get_business_index():
+  """Size of the dedup index and how many duplicate results and calls it has avoided."""
+  if database.business_index.stale:
+    database.rebuild_business_index()
+  return database.business_index.stats()
+
+@app.post("/business-index/rebuild")
+async def rebuild_business_index():
+  """Rebuild the dedup index from the full businesses table."""
+  duplicates = database.rebuild_business_index()
+  return {"duplicates_in_table": duplicates, **database.business_index.stats()}
+
+@app.get("/transcripts/export")
+async def export_transcripts():
+  """Stream every stored transcript as JSON lines for offline jobs."""
+  def iter_lines():
+    for conversation_id, transcript in transcript_store.iter_transcripts():
+      yield json.dumps({"conversation_id": conversation_id, "transcript": transcript}) + "\n"
+
+  return StreamingResponse(iter_lines(), media_type="application/x-ndjson")
+
+@app.get("/resilience")
+async def get_resilience():
+  """Concurrency limits, circuit state and call counts for each upstream provider."""
+  return {name: provider.snapshot() for name, provider in providers.items()}
+
+@app.get("/quote-extraction-stats")
+async def get_quote_extraction_stats():
+  """How often each quote extraction tier settles the quote, and how long each takes."""
+  return quote_extraction_stats.snapshot()
+
+@app.get("/calls")
+async def get_calls():
+  """Outbound call capacity, outcomes and the state of every call in progress."""
+  return call_tracker.snapshot()
+
+@app.get("/call-stats")
+async def get_call_stats():
+  """Per-call resource accounting, for checking that memory stays flat under load."""
+  return {**call_stats.snapshot(), "downlink": downlink_stats.snapshot()}
+
 def start():
     uvicorn.run(
       "server.main:app",
@@ -8,6 +8,10 @@ class Business(BaseModel):
   notes: Optional[str]
   quote: Optional[float]
   conversation_id: Optional[str]
+  service: Optional[str] = None
+  county: Optional[str] = None
+  discount_accepted: Optional[bool] = None
+  call_status: Optional[str] = None
 
 class FindBusinessesResult(BaseModel):
   businesses: List[Business]
\ No newline at end of file
@@ -0,0 +1,213 @@
+import os
+import re
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from baml_py import ClientRegistry
+
+from baml_client import b as baml
+from baml_client.types import Quote
+from .resilience import anthropic_provider, openai_chat_provider
+from .transcripts import format_transcript
+
+# BAML client tried before falling back to ExtractQuote's default (CustomSonnet)
+QUOTE_FAST_CLIENT = os.getenv("QUOTE_FAST_CLIENT", "CustomGPT4oMini")
+# Relative difference under which two extracted amounts count as the same quote
+QUOTE_AMOUNT_TOLERANCE = float(os.getenv("QUOTE_AMOUNT_TOLERANCE", "0.01"))
+
+# "$250", "$1,200.50", "250 dollars", "300 bucks"
+_AMOUNT = re.compile(
+  r"\$\s*(\d{1,3}(?:,\d{3})+|\d+)(\.\d{1,2})?"
+  r"|\b(\d{1,3}(?:,\d{3})+|\d+)(\.\d{1,2})?\s*(?:dollars|bucks)\b",
+  re.IGNORECASE,
+)
+# Wording that makes a bare amount incomplete (rates, extras, ranges); left to the models
+_QUALIFIER = re.compile(
+  r"\b(per|an hour|a foot|each|hourly|plus|extra|additional|not including|excluding|starting|starts|"
+  r"minimum|min|estimate|estimated|deposit|depend|depends|depending|roughly|approximately|"
+  r"up to|or more|at least|range|between|fee|fees)\b|\b(from|around|about)\s*\$?\d|/\s*(hr|hour|ft|sq)|\+",
+  re.IGNORECASE,
+)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_DISCOUNT = re.compile(r"\bdiscount", re.IGNORECASE)
+_ACCEPT = re.compile(
+  r"\b(yes|yeah|yep|sure|okay|ok|absolutely|of course|no problem|can do|we can do|i can do|deal)\b",
+  re.IGNORECASE,
+)
+_DECLINE = re.compile(
+  r"\b(no(?! problem)|nope|can't|cannot|can not|unfortunately|not able|don't do|firm)\b",
+  re.IGNORECASE,
+)
+# Wording that turns an "okay" or "yeah" into a brush-off or a maybe; such answers go to the models
+_HEDGE = re.compile(
+  r"\b(best price|best we can|lowest|already|the price is the price|don't think|not sure|"
+  r"probably|maybe|might|let me|have to (?:ask|check)|check with|well|i mean|but|if|only)\b",
+  re.IGNORECASE,
+)
+
+TIERS = ("deterministic", "fast", "strong")
+
+
+class TierStats:
+  def __init__(self):
+    self.attempts = 0
+    self.hits = 0
+    self.total_latency = 0.0
+
+  def snapshot(self, extractions: int) -> dict:
+    return {
+      "attempts": self.attempts,
+      "hits": self.hits,
+      "hit_rate": self.hits / extractions if extractions else None,
+      "mean_latency": self.total_latency / self.attempts if self.attempts else None,
+    }
+
+
+class QuoteExtractionStats:
+  def __init__(self):
+    self.extractions = 0
+    self.tiers: Dict[str, TierStats] = {tier: TierStats() for tier in TIERS}
+
+  def snapshot(self) -> dict:
+    return {
+      "extractions": self.extractions,
+      "tiers": {tier: stats.snapshot(self.extractions) for tier, stats in self.tiers.items()},
+    }
+
+
+quote_extraction_stats = QuoteExtractionStats()
+
+
+def parse_amounts(text: str) -> List[float]:
+  amounts = []
+  for match in _AMOUNT.finditer(text):
+    whole, cents = (match.group(1), match.group(2)) if match.group(1) else (match.group(3), match.group(4))
+    amounts.append(float(whole.replace(",", "") + (cents or "")))
+  return amounts
+
+
+def parse_discount_answer(transcript: List[dict]) -> Tuple[bool, Optional[bool]]:
+  """
+  Return whether the agent asked for a discount and, if the business's next
+  turn clearly answered, whether it was accepted. Only a plain yes with no
+  hedging counts as accepted; "Yeah, I mean, the price is the price." is left
+  undecided.
+  """
+  for i, turn in enumerate(transcript):
+    if turn.get("role") != "agent" or not _DISCOUNT.search(turn.get("message") or ""):
+      continue
+    for reply in transcript[i + 1:]:
+      message = reply.get("message") or ""
+      if reply.get("role") != "user" or not message.strip():
+        continue
+      accepted, declined = bool(_ACCEPT.search(message)), bool(_DECLINE.search(message))
+      if accepted and not declined and not _HEDGE.search(message):
+        return True, True
+      if declined and not accepted:
+        return True, False
+      return True, None
+    return True, None
+  return False, None
+
+
+def same_amount(a: Optional[float], b: Optional[float]) -> bool:
+  if a is None or b is None:
+    return a is None and b is None
+  return abs(a - b) <= QUOTE_AMOUNT_TOLERANCE * max(abs(a), abs(b), 1)
+
+
+def extract_quote_deterministic(transcript: List[dict]) -> Tuple[Optional[Quote], Set[float]]:
+  """
+  Pull the quote straight out of the business's turns. Returns a Quote only when
+  the transcript is unambiguous (one distinct amount, no qualifiers such as
+  "per hour" or "plus parts", and a clear discount answer if one was asked for),
+  along with every amount the business mentioned. The notes keep the business's
+  own quoting sentence.
+  """
+  amounts = set()
+  quoting_sentence = None
+  qualified = False
+  for turn in transcript:
+    if turn.get("role") != "user":
+      continue
+    for sentence in _SENTENCE_END.split(turn.get("message") or ""):
+      found = parse_amounts(sentence)
+      if found:
+        amounts.update(found)
+        quoting_sentence = quoting_sentence or sentence.strip()
+      qualified = qualified or bool(_QUALIFIER.search(sentence))
+  asked, accepted = parse_discount_answer(transcript)
+  if len(amounts) != 1 or qualified or (asked and accepted is None):
+    return None, amounts
+
+  amount = next(iter(amounts))
+  notes = f'Quoted ${amount:,.2f}: "{quoting_sentence}"'
+  if asked:
+    notes += " Agreed to the requested discount." if accepted else " Declined the requested discount."
+  return Quote(quote_amount=amount, notes=notes, discount_accepted=accepted), amounts
+
+
+_fast_registry: Optional[ClientRegistry] = None
+
+
+def fast_client_registry() -> ClientRegistry:
+  global _fast_registry
+  if _fast_registry is None:
+    _fast_registry = ClientRegistry()
+    _fast_registry.set_primary(QUOTE_FAST_CLIENT)
+  return _fast_registry
+
+
+async def _timed(tier: str, extract) -> Quote:
+  stats = quote_extraction_stats.tiers[tier]
+  stats.attempts += 1
+  started = time.perf_counter()
+  try:
+    return await extract()
+  finally:
+    stats.total_latency += time.perf_counter() - started
+
+
+async def extract_quote_tiered(transcript: List[dict]) -> Tuple[Quote, str]:
+  """
+  Extract a quote with the cheapest tier that can be trusted: the deterministic
+  parser, then the fast model, and the strong model only when the earlier tiers
+  disagree or the fast model fails. Returns the quote and the tier it came from.
+  """
+  quote_extraction_stats.extractions += 1
+  stats = quote_extraction_stats.tiers
+
+  stats["deterministic"].attempts += 1
+  started = time.perf_counter()
+  quote, amounts = extract_quote_deterministic(transcript)
+  stats["deterministic"].total_latency += time.perf_counter() - started
+  if quote is not None:
+    stats["deterministic"].hits += 1
+    return quote, "deterministic"
+
+  text = format_transcript(transcript)
+  try:
+    quote = await _timed("fast", lambda: openai_chat_provider.run_sync(
+      baml.ExtractQuote, text, {"client_registry": fast_client_registry()}
+    ))
+  except Exception as e:
+    print(f"[ExtractQuote] Fast tier failed: {e}")
+    quote = None
+  if quote is not None:
+    # Trust the fast model when it picked an amount the business actually said,
+    # or agrees there was no amount at all
+    agrees = any(same_amount(quote.quote_amount, amount) for amount in amounts) or (
+      not amounts and quote.quote_amount is None
+    )
+    if agrees:
+      stats["fast"].hits += 1
+      return quote, "fast"
+
+  quote = await _timed("strong", lambda: anthropic_provider.run_sync(baml.ExtractQuote, text))
+  stats["strong"].hits += 1
+  return quote, "strong"
+
+
+async def extract_quote(transcript: List[dict]) -> Quote:
+  quote, _ = await extract_quote_tiered(transcript)
+  return quote
@@ -0,0 +1,154 @@
+import asyncio
+import base64
+import json
+import os
+import struct
+import time
+from typing import Awaitable, Callable, Iterator, Optional, Tuple
+
+# Directory for call recordings; recording is off when unset
+CALL_RECORDING_DIR = os.getenv("CALL_RECORDING_DIR")
+FLUSH_INTERVAL = 0.5
+FLUSH_BYTES = 64 * 1024
+
+MAGIC = b"CALLREC1"
+# Record layout: microseconds since the call started, kind, payload length, payload
+_RECORD = struct.Struct("<QBI")
+
+# Raw mu-law audio, decoded from the base64 payloads on the wire
+MEDIA_INBOUND = 0   # business -> ElevenLabs
+MEDIA_OUTBOUND = 1  # ElevenLabs -> business
+# JSON control messages
+EVENT_TWILIO = 2      # start, stop
+EVENT_ELEVENLABS = 3  # interruption, ping
+EVENT_RELAY = 4       # clear, pong sent by us
+
+
+class CallRecorder:
+  """
+  Records a call's media frames and control events to a binary segment file.
+  Recording only appends to an in-memory buffer; a background task hands the
+  buffer to a worker thread for writing, so the relay never waits on disk.
+  """
+  def __init__(self, path: str):
+    self.path = path
+    self.frames = 0
+    self.bytes_written = 0
+    self._started = time.monotonic()
+    self._buffer = bytearray(MAGIC)
+    self._file = None
+    self._flush_task: Optional[asyncio.Task] = None
+    self._wake = asyncio.Event()
+    self._closing = False
+
+  def start(self):
+    self._flush_task = asyncio.create_task(self._flush_loop())
+
+  def media(self, kind: int, payload: str):
+    self._append(kind, base64.b64decode(payload))
+
+  def event(self, kind: int, message: dict):
+    self._append(kind, json.dumps(message, separators=(",", ":")).encode())
+
+  def _append(self, kind: int, payload: bytes):
+    elapsed = int((time.monotonic() - self._started) * 1_000_000)
+    self._buffer += _RECORD.pack(elapsed, kind, len(payload))
+    self._buffer += payload
+    self.frames += 1
+    if len(self._buffer) >= FLUSH_BYTES:
+      self._wake.set()
+
+  async def _flush_loop(self):
+    # Never cancelled: a write interrupted halfway would drop or reorder data
+    while not self._closing:
+      try:
+        await asyncio.wait_for(self._wake.wait(), FLUSH_INTERVAL)
+      except asyncio.TimeoutError:
+        pass
+      self._wake.clear()
+      await self._flush()
+    await self._flush()
+
+  async def _flush(self):
+    if not self._buffer:
+      return
+    data, self._buffer = self._buffer, bytearray()
+    if self._file is None:
+      self._file, self.path = await asyncio.to_thread(_create_new, self.path)
+    await asyncio.to_thread(self._file.write, data)
+    self.bytes_written += len(data)
+
+  async def close(self):
+    self._closing = True
+    self._wake.set()
+    if self._flush_task:
+      # Shielded so a cancelled caller still leaves a complete file behind
+      await asyncio.shield(self._flush_task)
+    else:
+      await self._flush()
+    if self._file:
+      await asyncio.to_thread(self._file.close)
+    print(f"[CallRecorder] Wrote {self.frames} frames ({self.bytes_written} bytes) to {self.path}")
+
+
+def _create_new(path: str):
+  """
+  Create the recording file, never appending to an existing one (a second
+  session with the same CallSid, e.g. a replay): that gets a numbered name.
+  """
+  base, extension = os.path.splitext(path)
+  candidate, n = path, 1
+  while True:
+    try:
+      return open(candidate, "xb"), candidate
+    except FileExistsError:
+      candidate = f"{base}-{n}{extension}"
+      n += 1
+
+
+def open_recorder(call_sid: str, directory: Optional[str] = CALL_RECORDING_DIR) -> Optional[CallRecorder]:
+  """Start recording a call, or return None when recording is disabled."""
+  if not directory:
+    return None
+  os.makedirs(directory, exist_ok=True)
+  recorder = CallRecorder(os.path.join(directory, f"{call_sid}.rec"))
+  recorder.start()
+  return recorder
+
+
+def read_recording(path: str) -> Iterator[Tuple[float, int, bytes]]:
+  """Yield (seconds since call start, kind, payload) for each record, stopping at a truncated tail."""
+  with open(path, "rb") as f:
+    if f.read(len(MAGIC)) != MAGIC:
+      raise ValueError(f"{path} is not a call recording")
+    while True:
+      header = f.read(_RECORD.size)
+      if len(header) < _RECORD.size:
+        return
+      elapsed, kind, length = _RECORD.unpack(header)
+      payload = f.read(length)
+      if len(payload) < length:
+        return
+      yield elapsed / 1_000_000, kind, payload
+
+
+async def replay(
+  path: str,
+  send: Callable[[int, bytes], Awaitable[None]],
+  speed: float = 1.0,
+  kinds: Optional[set] = None,
+):
+  """
+  Feed a recording to send(kind, payload) with its original pacing, sped up by
+  speed (0 sends everything as fast as possible). Pacing is scheduled from the
+  replay start, so slow sends don't accumulate drift.
+  """
+  started = time.monotonic()
+  for elapsed, kind, payload in read_recording(path):
+    if kinds is not None and kind not in kinds:
+      continue
+    if speed > 0:
+      delay = started + elapsed / speed - time.monotonic()
+      if delay > 0:
+        await asyncio.sleep(delay)
+    await send(kind, payload)
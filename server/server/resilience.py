@@ -0,0 +1,301 @@
+import asyncio
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+import httpx
+from fastapi import HTTPException
+
+T = TypeVar("T")
+
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+# Statuses that mean the upstream rejected the request without acting on it,
+# so retrying is safe even for calls with side effects
+REJECTED_STATUSES = {429, 503}
+
+
+class UpstreamError(HTTPException):
+  """An upstream API answered with an error status. Surfaces to clients with the same status."""
+  def __init__(self, status_code: int, detail: str, retry_after: Optional[float] = None):
+    super().__init__(status_code=status_code, detail=detail)
+    self.retry_after = retry_after
+
+  @classmethod
+  def from_response(cls, response: httpx.Response, detail: str) -> "UpstreamError":
+    return cls(response.status_code, detail, parse_retry_after(response.headers.get("retry-after")))
+
+
+class CircuitOpenError(HTTPException):
+  def __init__(self, provider: str):
+    super().__init__(status_code=503, detail=f"{provider} is unavailable, try again later")
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+  """Parse a Retry-After header given either as seconds or as an HTTP date."""
+  if not value:
+    return None
+  try:
+    return max(0.0, float(value))
+  except ValueError:
+    pass
+  try:
+    return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+  except (TypeError, ValueError):
+    return None
+
+
+def error_status(error: Exception) -> Optional[int]:
+  """Find the HTTP status on errors from httpx, Twilio, websockets, BAML or our own HTTPExceptions."""
+  for source in (error, getattr(error, "response", None)):
+    for attribute in ("status_code", "status"):
+      status = getattr(source, attribute, None)
+      if isinstance(status, int):
+        return status
+  return None
+
+
+def error_retry_after(error: Exception) -> Optional[float]:
+  retry_after = getattr(error, "retry_after", None)
+  if retry_after is not None:
+    return retry_after
+  for source in (error, getattr(error, "response", None)):
+    headers = getattr(source, "headers", None)
+    if headers:
+      return parse_retry_after(headers.get("retry-after") or headers.get("Retry-After"))
+  return None
+
+
+def is_retryable(error: Exception, idempotent: bool) -> bool:
+  status = error_status(error)
+  if status is not None:
+    return status in (RETRYABLE_STATUSES if idempotent else REJECTED_STATUSES)
+  # No status means we never got an answer; only retry if repeating the call is harmless
+  return idempotent and isinstance(error, (httpx.TransportError, OSError))
+
+
+class AdaptiveLimiter:
+  """
+  AIMD concurrency limit: grows by one slot per limit's worth of successful
+  calls and halves whenever the provider signals overload (retryable errors, or
+  latency over the target when one is set).
+  """
+  def __init__(
+    self,
+    initial: int,
+    min_limit: int = 1,
+    max_limit: int = 64,
+    backoff: float = 0.5,
+    latency_target: Optional[float] = None,
+  ):
+    self.limit = float(initial)
+    self.min_limit = min_limit
+    self.max_limit = max_limit
+    self.backoff = backoff
+    self.latency_target = latency_target
+    self.in_flight = 0
+    self._condition = asyncio.Condition()
+    self._releasing = set()
+
+  async def acquire(self, timeout: float):
+    async with self._condition:
+      await asyncio.wait_for(
+        self._condition.wait_for(lambda: self.in_flight < int(self.limit)), timeout
+      )
+      self.in_flight += 1
+
+  async def release(self, overloaded: Optional[bool]):
+    """Free a slot; overloaded=None leaves the limit unchanged."""
+    async with self._condition:
+      self.in_flight -= 1
+      if overloaded:
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+      elif overloaded is not None:
+        self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+      self._condition.notify_all()
+
+  def hold_until(self, future: asyncio.Future):
+    """Take an extra slot until future completes, for work that outlives its cancelled caller."""
+    self.in_flight += 1
+
+    def done(_):
+      task = asyncio.ensure_future(self.release(None))
+      self._releasing.add(task)
+      task.add_done_callback(self._releasing.discard)
+
+    future.add_done_callback(done)
+
+
+class CircuitBreaker:
+  """Opens after consecutive failures, then lets a single probe through once reset_timeout has passed."""
+  def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+    self.failure_threshold = failure_threshold
+    self.reset_timeout = reset_timeout
+    self.state = "closed"
+    self.consecutive_failures = 0
+    self._opened_at = 0.0
+    self._probing = False
+
+  def allow(self) -> bool:
+    if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+      self.state = "half_open"
+      self._probing = False
+    if self.state == "half_open" and not self._probing:
+      self._probing = True
+      return True
+    return self.state == "closed"
+
+  def record_success(self):
+    self.state = "closed"
+    self.consecutive_failures = 0
+    self._probing = False
+
+  def abandon_probe(self):
+    """The probe ended without an answer (e.g. it was cancelled), so let the next call probe instead."""
+    self._probing = False
+
+  def record_failure(self):
+    self.consecutive_failures += 1
+    if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+      self.state = "open"
+      self._opened_at = time.monotonic()
+      self._probing = False
+
+
+class Provider:
+  """Concurrency limit, retries and circuit breaker shared by every call to one upstream API."""
+  def __init__(
+    self,
+    name: str,
+    initial_limit: int,
+    max_limit: int,
+    max_attempts: int = 3,
+    queue_timeout: float = 10,
+    base_delay: float = 0.5,
+    max_delay: float = 10,
+    max_retry_after: float = 30,
+    latency_target: Optional[float] = None,
+    failure_threshold: int = 5,
+    reset_timeout: float = 30,
+  ):
+    self.name = name
+    self.limiter = AdaptiveLimiter(initial_limit, max_limit=max_limit, latency_target=latency_target)
+    self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+    self.max_attempts = max_attempts
+    self.queue_timeout = queue_timeout
+    self.base_delay = base_delay
+    self.max_delay = max_delay
+    self.max_retry_after = max_retry_after
+    self.calls = 0
+    self.successes = 0
+    self.failures = 0
+    self.retries = 0
+    self.rejected = 0
+
+  async def call(self, fn: Callable[[], Awaitable[T]], idempotent: bool = True, max_attempts: Optional[int] = None) -> T:
+    attempts = max_attempts or self.max_attempts
+    for attempt in range(1, attempts + 1):
+      try:
+        await self.limiter.acquire(self.queue_timeout)
+      except asyncio.TimeoutError:
+        self.rejected += 1
+        raise HTTPException(status_code=503, detail=f"Too many pending requests to {self.name}")
+      if not self.breaker.allow():
+        await self.limiter.release(None)
+        self.rejected += 1
+        raise CircuitOpenError(self.name)
+
+      self.calls += 1
+      overloaded = None
+      started = time.monotonic()
+      try:
+        result = await fn()
+      except Exception as e:
+        self.failures += 1
+        retryable = is_retryable(e, idempotent)
+        overloaded = retryable
+        if retryable:
+          self.breaker.record_failure()
+        else:
+          # The provider answered, so it is healthy even if the request was bad
+          self.breaker.record_success()
+        delay = self._retry_delay(e, attempt)
+        if not retryable or attempt == attempts or delay is None:
+          raise
+        print(f"[Resilience] {self.name} call failed ({e!r}), retrying in {delay:.1f}s")
+      except BaseException:
+        # Cancelled before the provider answered: no verdict either way
+        self.breaker.abandon_probe()
+        raise
+      else:
+        latency = time.monotonic() - started
+        target = self.limiter.latency_target
+        overloaded = target is not None and latency > target
+        self.breaker.record_success()
+        self.successes += 1
+        return result
+      finally:
+        await self.limiter.release(overloaded)
+
+      self.retries += 1
+      await asyncio.sleep(delay)
+
+  async def run_sync(self, fn: Callable[..., T], *args, idempotent: bool = True, **kwargs) -> T:
+    """
+    Run a blocking SDK call in a worker thread under this provider's limits.
+    Cancelling the caller can't stop the thread, so the slot stays taken until
+    the thread finishes.
+    """
+    async def run() -> T:
+      thread = asyncio.ensure_future(asyncio.to_thread(fn, *args, **kwargs))
+      try:
+        return await asyncio.shield(thread)
+      except asyncio.CancelledError:
+        if not thread.done():
+          # Nobody awaits the thread any more; retrieve its result so errors aren't logged as unhandled
+          thread.add_done_callback(lambda future: future.cancelled() or future.exception())
+          self.limiter.hold_until(thread)
+        raise
+
+    return await self.call(run, idempotent=idempotent)
+
+  def _retry_delay(self, error: Exception, attempt: int) -> Optional[float]:
+    # Full jitter, but never sooner than the provider asked for
+    delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+    retry_after = error_retry_after(error)
+    if retry_after is not None:
+      if retry_after > self.max_retry_after:
+        return None
+      delay = max(delay, retry_after)
+    return delay
+
+  def snapshot(self) -> dict:
+    return {
+      "limit": round(self.limiter.limit, 2),
+      "in_flight": self.limiter.in_flight,
+      "circuit": self.breaker.state,
+      "consecutive_failures": self.breaker.consecutive_failures,
+      "calls": self.calls,
+      "successes": self.successes,
+      "failures": self.failures,
+      "retries": self.retries,
+      "rejected": self.rejected,
+    }
+
+
+# Browser agent runs take minutes, so they aren't retried and may wait longer for a slot
+openai_provider = Provider("openai", initial_limit=4, max_limit=16, max_attempts=1, queue_timeout=60)
+# Short BAML completions (fast-tier quote extraction, listing resolution) get their own slots so
+# they never queue behind agent runs
+openai_chat_provider = Provider("openai_chat", initial_limit=8, max_limit=32, latency_target=10)
+anthropic_provider = Provider("anthropic", initial_limit=8, max_limit=32, latency_target=30)
+elevenlabs_provider = Provider("elevenlabs", initial_limit=16, max_limit=64, latency_target=5)
+twilio_provider = Provider("twilio", initial_limit=8, max_limit=32, latency_target=5)
+search_provider = Provider("search", initial_limit=4, max_limit=16, latency_target=5)
+
+providers: Dict[str, Provider] = {
+  provider.name: provider
+  for provider in (
+    openai_provider, openai_chat_provider, anthropic_provider, elevenlabs_provider, twilio_provider, search_provider
+  )
+}
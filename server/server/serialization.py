@@ -0,0 +1,31 @@
+from typing import List
+
+from pydantic import TypeAdapter
+
+from .models import Business, FindBusinessesResult
+
+# Built once at import so validators and serializers aren't rebuilt per request
+business_list_adapter = TypeAdapter(List[Business])
+find_businesses_result_adapter = TypeAdapter(FindBusinessesResult)
+
+
+def dump_businesses(businesses: List[Business]) -> List[dict]:
+  """Dump a list of businesses in one call to the compiled serializer."""
+  return business_list_adapter.dump_python(businesses)
+
+
+def parse_find_businesses_result(raw: str) -> FindBusinessesResult:
+  return find_businesses_result_adapter.validate_json(raw)
+
+
+def dump_find_businesses_result(result: FindBusinessesResult) -> dict:
+  return find_businesses_result_adapter.dump_python(result)
+
+
+def businesses_from_rows(rows: List[dict]) -> List[Business]:
+  """
+  Load businesses from database rows. Columns that aren't model fields (id,
+  created_at, ...) are ignored. Bulk validation runs entirely in pydantic-core,
+  which measures faster than a Python loop over Business.model_construct.
+  """
+  return business_list_adapter.validate_python(rows)
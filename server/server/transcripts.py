@@ -0,0 +1,99 @@
+import json
+import os
+import struct
+import zlib
+from typing import Dict, IO, Iterator, List, Optional, Tuple
+
+TRANSCRIPT_STORE_PATH = os.getenv("TRANSCRIPT_STORE_PATH", "data/transcripts.bin")
+
+# ElevenLabs conversation statuses after which the transcript no longer changes
+FINAL_STATUSES = {"done", "failed"}
+
+# Record layout: key length, payload length, key (utf-8), zlib-compressed JSON payload
+_HEADER = struct.Struct("<HI")
+
+
+def format_transcript(transcript: List[dict]) -> str:
+  """Render ElevenLabs transcript turns as the text passed to quote extraction."""
+  return "".join(f"{message['role']}: {message.get('message') or ''}\n\n" for message in transcript)
+
+
+class TranscriptStore:
+  """
+  Append-only store of final conversation transcripts keyed by conversation_id.
+  Each record is compressed on its own, and an in-memory index of offsets is
+  rebuilt by scanning record headers when the store is opened.
+  """
+  def __init__(self, path: str = TRANSCRIPT_STORE_PATH):
+    self.path = path
+    self._index: Dict[str, Tuple[int, int]] = {}
+    directory = os.path.dirname(path)
+    if directory:
+      os.makedirs(directory, exist_ok=True)
+    self._load_index()
+
+  def _load_index(self):
+    if not os.path.exists(self.path):
+      return
+    with open(self.path, "rb") as f:
+      size = os.fstat(f.fileno()).st_size
+      offset = 0
+      while True:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+          break
+        key_len, payload_len = _HEADER.unpack(header)
+        key = f.read(key_len)
+        payload_offset = offset + _HEADER.size + key_len
+        f.seek(payload_len, os.SEEK_CUR)
+        if len(key) < key_len or f.tell() > size:
+          break
+        self._index[key.decode()] = (payload_offset, payload_len)
+        offset = payload_offset + payload_len
+    # Drop a partially written record left behind by a crash
+    if offset < size:
+      print(f"[TranscriptStore] Truncating incomplete record at offset {offset}")
+      with open(self.path, "r+b") as f:
+        f.truncate(offset)
+
+  def __contains__(self, conversation_id: str) -> bool:
+    return conversation_id in self._index
+
+  def __len__(self) -> int:
+    return len(self._index)
+
+  def get(self, conversation_id: str) -> Optional[List[dict]]:
+    location = self._index.get(conversation_id)
+    if location is None:
+      return None
+    offset, length = location
+    with open(self.path, "rb") as f:
+      f.seek(offset)
+      return json.loads(zlib.decompress(f.read(length)))
+
+  def put(self, conversation_id: str, transcript: List[dict]):
+    if conversation_id in self._index:
+      return
+    key = conversation_id.encode()
+    payload = zlib.compress(json.dumps(transcript, separators=(",", ":")).encode())
+    with open(self.path, "ab") as f:
+      offset = f.tell()
+      f.write(_HEADER.pack(len(key), len(payload)) + key + payload)
+    self._index[conversation_id] = (offset + _HEADER.size + len(key), len(payload))
+
+  def iter_transcripts(self) -> Iterator[Tuple[str, List[dict]]]:
+    """Stream every stored transcript in insertion order, one record in memory at a time."""
+    if not self._index:
+      return
+    with open(self.path, "rb") as f:
+      for conversation_id, (offset, length) in self._index.items():
+        f.seek(offset)
+        yield conversation_id, json.loads(zlib.decompress(f.read(length)))
+
+  def export_jsonl(self, fp: IO[str]) -> int:
+    """Write every transcript to fp as JSON lines and return how many were written."""
+    count = 0
+    for conversation_id, transcript in self.iter_transcripts():
+      fp.write(json.dumps({"conversation_id": conversation_id, "transcript": transcript}) + "\n")
+      count += 1
+    return count
@@ -0,0 +1,75 @@
+import asyncio
+from urllib.parse import urlencode
+
+import pytest
+
+from server.call_lifecycle import STALE_CALL_TIMEOUT, CallRequest, CallTracker, parse_status_callback
+
+URL = "https://example.ngrok-free.app/call-status"
+AUTH_TOKEN = "12345"
+
+
+def test_status_callback_signature_covers_blank_fields():
+  validator = pytest.importorskip("twilio.request_validator").RequestValidator(AUTH_TOKEN)
+  params = {
+    "CallSid": "CA123",
+    "CallStatus": "busy",
+    "FromZip": "",
+    "ToCity": "",
+    "CallerZip": "",
+    "To": "+16505550142",
+  }
+  signature = validator.compute_signature(URL, params)
+  body = urlencode(params).encode()
+
+  parsed = parse_status_callback(body)
+  assert parsed == params
+  assert validator.validate(URL, parsed, signature)
+
+
+def make_request() -> CallRequest:
+  return CallRequest("https://bayplumbingco.com/", "+16505550142", "https://example/twiml", URL)
+
+
+def test_reserved_slots_cap_concurrent_calls():
+  tracker = CallTracker(max_active=2)
+  assert tracker.reserve("6505550142") and tracker.reserve("6505550199")
+  assert not tracker.reserve("6505550123")
+  # A call that failed to place gives its slot back
+  tracker.release("6505550199")
+  assert tracker.reserve("6505550123")
+
+
+def test_numbers_count_as_in_progress_from_reservation_until_the_call_ends():
+  tracker = CallTracker(max_active=2)
+  assert tracker.reserve("(650) 555-0142")
+  assert tracker.call_in_progress("+16505550142")
+  tracker.register("CA1", make_request())
+  assert tracker.call_in_progress("650.555.0142")
+  tracker.update("CA1", "completed")
+  assert not tracker.call_in_progress("+16505550142")
+
+
+def test_every_terminal_transition_runs_the_end_handler():
+  async def scenario():
+    tracker = CallTracker(max_active=2)
+    ended = []
+
+    async def on_call_ended(record):
+      ended.append((record.call_sid, record.state))
+
+    tracker.on_call_ended = on_call_ended
+    # A final callback that beats calls.create back is applied on register
+    tracker.update("CA1", "busy")
+    assert tracker.reserve("+16505550142")
+    tracker.register("CA1", make_request())
+    # A call that never reports a final status is expired
+    assert tracker.reserve("+16505550142")
+    stale = tracker.register("CA2", make_request())
+    stale.history[0] = (stale.state, stale.history[0][1] - STALE_CALL_TIMEOUT - 1)
+    assert tracker.reserve("+16505550199")
+    await asyncio.sleep(0)
+    assert sorted(ended) == [("CA1", "busy"), ("CA2", "canceled")]
+    assert tracker.active == 1
+
+  asyncio.run(scenario())
@@ -0,0 +1,52 @@
+import asyncio
+import base64
+
+from server.call_session import CallSession, SessionEnded
+
+# Half a second of speech, more than the downlink lets Twilio buffer ahead
+GOODBYE = [base64.b64encode(bytes(800)).decode() for _ in range(5)]
+
+
+class FakeTwilioSocket:
+  def __init__(self):
+    self.sent = []
+    self.closed = False
+
+  async def send_json(self, message: dict):
+    assert not self.closed
+    self.sent.append(message)
+
+  async def close(self):
+    self.closed = True
+
+  @property
+  def media_bytes(self) -> int:
+    return sum(len(base64.b64decode(m["media"]["payload"])) for m in self.sent if m["event"] == "media")
+
+
+def run_session(reason: str, drain_timeout: float = 2) -> FakeTwilioSocket:
+  websocket = FakeTwilioSocket()
+  session = CallSession(websocket, drain_timeout=drain_timeout)
+
+  async def reader():
+    for chunk in GOODBYE:
+      await session.send_audio(chunk)
+    raise SessionEnded(reason)
+
+  asyncio.run(session.run(reader))
+  assert session.end_reason == reason
+  return websocket
+
+
+def test_goodbye_plays_out_when_twilio_stops_the_stream():
+  assert run_session("twilio_stop").media_bytes == 5 * 800
+
+
+def test_audio_is_dropped_when_the_session_fails():
+  assert run_session("idle_timeout").media_bytes < 5 * 800
+
+
+def test_drain_gives_up_after_its_timeout():
+  websocket = run_session("twilio_stop", drain_timeout=0.05)
+  assert websocket.closed
+  assert websocket.media_bytes < 5 * 800
@@ -0,0 +1,79 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from baml_client.types import BusinessListing
+from benchmarks.fixture_server import fixture_url_template, start_fixture_server
+from server import discovery
+from server.dedup import normalize_host
+from server.discovery import HttpSearchBackend, SearchResult, discover_businesses, resolve_ambiguous
+
+
+@pytest.fixture(scope="module")
+def fixture_run():
+  """Discover from the fixture pages once, keeping the raw pages too. One event loop, as the providers' limiters bind to it."""
+  server = start_fixture_server()
+  try:
+    backend = HttpSearchBackend(fixture_url_template(server))
+
+    async def run():
+      found = await discover_businesses("plumbing", "San Mateo County", backend=backend, use_llm=False)
+      pages = await asyncio.gather(*(backend.fetch("plumbing", page) for page in range(2)))
+      return found, pages
+
+    (result, tokens), pages = asyncio.run(run())
+  finally:
+    server.shutdown()
+  return result, tokens, pages
+
+
+@pytest.fixture
+def fixture_result(fixture_run):
+  return fixture_run[:2]
+
+
+def test_fixture_pages_yield_the_listed_businesses(fixture_result):
+  result, tokens = fixture_result
+  assert [business.name for business in result.businesses] == [
+    "Bay Plumbing Co.",
+    "Peninsula Rooter & Drain",
+    "Coastside Plumbing Services",
+    "Foster City Plumbing",
+    "Millbrae Plumbing & Heating",
+    "Burlingame Drain Pros",
+    "Belmont Plumbing Repair",
+  ]
+  assert tokens == 0
+
+
+def test_aggregators_are_excluded(fixture_result):
+  result, _ = fixture_result
+  hosts = {normalize_host(business.url).split("/")[0] for business in result.businesses}
+  assert not hosts & {"yelp.com", "homeadvisor.com"}
+
+
+def test_bay_plumbing_is_listed_once_across_pages(fixture_result):
+  result, _ = fixture_result
+  assert sum(business.name.startswith("Bay Plumbing") for business in result.businesses) == 1
+
+
+def test_results_with_several_phones_are_left_for_the_llm(fixture_run):
+  _, _, pages = fixture_run
+  results = [result for html in pages for result in discovery.parse_results_page(html)]
+  _, ambiguous = discovery.split_results(results)
+  redwood = [result for result in ambiguous if result.name == "Redwood City Plumbers"]
+  assert len(redwood) == 1 and len(redwood[0].phones) == 2
+
+
+def test_llm_listings_outside_the_ambiguous_results_are_dropped(monkeypatch):
+  result = SearchResult("https://redwoodcityplumbers.com/", "Redwood City Plumbers")
+  result.text = ["Call (650) 555-0101 or (650) 555-0102"]
+  listings = [
+    BusinessListing(name="Redwood City Plumbers", url="https://www.redwoodcityplumbers.com/contact", phone_number="(650) 555-0101"),
+    BusinessListing(name="Made Up Plumbing", url="https://madeupplumbing.com", phone_number="(650) 555-0199"),
+    BusinessListing(name="Yelp", url="https://www.yelp.com/search?find_desc=plumbing", phone_number="(650) 555-0198"),
+  ]
+  monkeypatch.setattr(discovery, "baml", SimpleNamespace(ExtractBusinessListings=lambda snippets: listings))
+  businesses, _ = asyncio.run(resolve_ambiguous([result]))
+  assert [(business.name, business.phone_number) for business in businesses] == [("Redwood City Plumbers", 6505550101)]
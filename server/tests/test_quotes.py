@@ -0,0 +1,52 @@
+import pytest
+
+from server.quotes import extract_quote_deterministic, parse_discount_answer
+
+ASK = {"role": "agent", "message": "Is there any discount you could offer on that?"}
+
+
+@pytest.mark.parametrize("reply, accepted", [
+  ("Yes, we can do ten percent off.", True),
+  ("Sure, no problem.", True),
+  ("Absolutely, I can do that.", True),
+  ("No, sorry.", False),
+  ("Unfortunately we can't do that.", False),
+  ("Nope, that price is firm.", False),
+  ("Okay, well, that's already our best price.", None),
+  ("Yeah, I mean, the price is the price.", None),
+  ("Sure, if you book this week.", None),
+  ("Yeah, I don't think we can go lower.", None),
+  ("Okay, let me check with my manager.", None),
+  ("Yes and no, it depends.", None),
+  ("Hmm.", None),
+])
+def test_discount_answer(reply, accepted):
+  transcript = [ASK, {"role": "user", "message": reply}]
+  assert parse_discount_answer(transcript) == (True, accepted)
+
+
+def test_discount_answer_skips_blank_turns_and_reports_unasked():
+  assert parse_discount_answer([ASK, {"role": "user", "message": " "}, {"role": "user", "message": "Sure."}]) == (True, True)
+  assert parse_discount_answer([ASK]) == (True, None)
+  assert parse_discount_answer([{"role": "user", "message": "It's $250."}]) == (False, None)
+
+
+@pytest.mark.parametrize("turns, amount, discount_accepted", [
+  ([("user", "It would be $250 total.")], 250.0, None),
+  ([("user", "That runs 1,200 dollars."), ("agent", "Any discount?"), ("user", "No, sorry.")], 1200.0, False),
+  ([("user", "$300 for the job."), ("agent", "Could you discount that?"), ("user", "Sure, we can do that.")], 300.0, True),
+  # Qualified, ambiguous or hedged answers are left to the models
+  ([("user", "It's $95 per hour.")], None, None),
+  ([("user", "It's $250, plus parts.")], None, None),
+  ([("user", "Either $200 or $250.")], None, None),
+  ([("user", "It's $250."), ("agent", "Any discount?"), ("user", "Okay, well, that's already our best price.")], None, None),
+  ([("user", "I'd have to see it first.")], None, None),
+])
+def test_deterministic_quote(turns, amount, discount_accepted):
+  transcript = [{"role": role, "message": message} for role, message in turns]
+  quote, _ = extract_quote_deterministic(transcript)
+  if amount is None:
+    assert quote is None
+  else:
+    assert quote.quote_amount == amount
+    assert quote.discount_accepted == discount_accepted
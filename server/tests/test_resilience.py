@@ -0,0 +1,89 @@
+import asyncio
+import threading
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from server.resilience import CircuitOpenError, Provider
+
+
+def test_cancelled_half_open_probe_lets_the_next_call_probe():
+  async def scenario():
+    provider = Provider("test", initial_limit=4, max_limit=4, max_attempts=1, failure_threshold=1, reset_timeout=0)
+
+    async def fail():
+      raise httpx.ConnectError("down")
+
+    with pytest.raises(httpx.ConnectError):
+      await provider.call(fail)
+    assert provider.breaker.state == "open"
+
+    probe_started = asyncio.Event()
+
+    async def hang():
+      probe_started.set()
+      await asyncio.sleep(60)
+
+    probe = asyncio.create_task(provider.call(hang))
+    await probe_started.wait()
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+      await probe
+    assert provider.breaker.state == "half_open"
+
+    async def succeed():
+      return "ok"
+
+    assert await provider.call(succeed) == "ok"
+    assert provider.breaker.state == "closed"
+    assert provider.limiter.in_flight == 0
+
+  asyncio.run(scenario())
+
+
+def test_open_circuit_rejects_calls():
+  async def scenario():
+    provider = Provider("test", initial_limit=4, max_limit=4, max_attempts=1, failure_threshold=1, reset_timeout=60)
+
+    async def fail():
+      raise httpx.ConnectError("down")
+
+    with pytest.raises(httpx.ConnectError):
+      await provider.call(fail)
+    with pytest.raises(CircuitOpenError):
+      await provider.call(fail)
+
+  asyncio.run(scenario())
+
+
+def test_cancelled_sync_call_keeps_its_slot_until_the_thread_finishes():
+  async def scenario():
+    provider = Provider("test", initial_limit=1, max_limit=1, max_attempts=1, queue_timeout=0.05)
+    started = threading.Event()
+    finish = threading.Event()
+
+    def blocking():
+      started.set()
+      finish.wait(5)
+      return "late"
+
+    call = asyncio.create_task(provider.run_sync(blocking))
+    await asyncio.to_thread(started.wait, 5)
+    call.cancel()
+    with pytest.raises(asyncio.CancelledError):
+      await call
+    # The thread is still running, so the only slot is still taken
+    assert provider.limiter.in_flight == 1
+    with pytest.raises(HTTPException):
+      await provider.run_sync(lambda: "ok")
+
+    finish.set()
+    for _ in range(100):
+      if provider.limiter.in_flight == 0:
+        break
+      await asyncio.sleep(0.01)
+    assert provider.limiter.in_flight == 0
+    assert await provider.run_sync(lambda: "ok") == "ok"
+
+  asyncio.run(scenario())